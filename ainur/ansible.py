@@ -13,23 +13,60 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import atexit
+import hashlib
 import os
+import shlex
 import shutil
 import tempfile
+import threading
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Generator, Mapping, Optional, Union
+from typing import Any, Dict, Generator, Mapping, Optional, Set, Union
 
+import orjson
 import yaml
 from loguru import logger
 
 
+# Ansible's own default number of forks
+ANSIBLE_DEFAULT_FORKS = 5
+
+
 def _check_dir_exists(d: Path):
     if not d.exists() or not d.is_dir():
         raise RuntimeError(
             f'{d} either does not exist or is not a directory.')
 
 
+def _cmdline_forks(cmdline_file: Path) -> int:
+    # number of forks set through -f/--forks in an env/cmdline file
+    try:
+        args = shlex.split(cmdline_file.read_text())
+    except FileNotFoundError:
+        return ANSIBLE_DEFAULT_FORKS
+
+    forks = ANSIBLE_DEFAULT_FORKS
+    for i, arg in enumerate(args):
+        if arg in ('-f', '--forks') and i + 1 < len(args):
+            forks = int(args[i + 1])
+        elif arg.startswith('--forks='):
+            forks = int(arg[len('--forks='):])
+        elif arg.startswith('-f') and arg[2:].isdigit():
+            forks = int(arg[2:])
+    return forks
+
+
+# persistent environments which have not been removed yet
+_persistent_dirs: Set[Path] = set()
+
+
+@atexit.register
+def _remove_persistent_dirs() -> None:
+    for env_dir in list(_persistent_dirs):
+        AnsibleContext.remove_persistent(env_dir)
+
+
 # TODO: test
 
 class AnsibleContext:
@@ -71,8 +108,29 @@ class AnsibleContext:
         _check_dir_exists(self._env_dir)
         _check_dir_exists(self._proj_dir)
 
+        self._forks = _cmdline_forks(self._env_dir / 'cmdline')
+
         logger.debug(f'Initialized Ansible context at {self._base_dir}')
 
+    def forks(self, num_hosts: int) -> Optional[int]:
+        """
+        Number of forks to pass on to ansible-runner for a run over the
+        given number of hosts.
+
+        Parameters
+        ----------
+        num_hosts
+            Number of hosts in the run.
+
+        Returns
+        -------
+        Optional[int]
+            The number of hosts if it is larger than the number of forks
+            configured in the env/cmdline of the base dir, so that all hosts
+            are handled at once, otherwise None to keep the configured value.
+        """
+        return num_hosts if num_hosts > self._forks else None
+
     @contextmanager
     def __call__(self,
                  inventory: Mapping,
@@ -108,42 +166,7 @@ class AnsibleContext:
 
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_dir = Path(tmp_dir)
-
-            # set up the file structure ansible-runner expects,
-            # inside the tmpdir
-            os.symlink(self._proj_dir, tmp_dir / 'project')
-            # os.symlink(self._env_dir, tmp_dir / 'env')
-            shutil.copytree(self._env_dir, tmp_dir / 'env')
-
-            # potentially override some extravars
-            extravars_file = ((tmp_dir / 'env') / 'extravars')
-            try:
-                with extravars_file.open('r') as fp:
-                    orig_extravars = yaml.safe_load(fp)
-                if orig_extravars is None:
-                    orig_extravars = {}
-                elif not isinstance(orig_extravars, Dict):
-                    raise RuntimeError('Ansible extravars file should be an '
-                                       'YAML file containing a mapping!')
-            except FileNotFoundError:
-                orig_extravars = {}
-
-            orig_extravars.update(extravars)
-            with extravars_file.open('w') as fp:
-                yaml.safe_dump(orig_extravars, stream=fp)
-
-            # if using a custom ssh key, copy it to the env dir
-            if ssh_key is not None:
-                ssh_key = Path(ssh_key).resolve()
-                ssh_key_path = tmp_dir / 'env' / 'ssh_key'
-                shutil.copy(ssh_key, ssh_key_path)
-                os.chmod(ssh_key_path, 0o600)
-
-            # make a temporary inventory dir and dump the dict
-            inv_dir = tmp_dir / 'inventory'
-            inv_dir.mkdir(parents=True, exist_ok=True)
-            with (inv_dir / 'hosts').open('w') as fp:
-                yaml.safe_dump(inventory, stream=fp)
+            self._populate(tmp_dir, inventory, ssh_key, extravars)
 
             logger.debug(f'Created temporary Ansible '
                          f'execution context at {tmp_dir}')
@@ -152,3 +175,237 @@ class AnsibleContext:
             finally:
                 logger.debug(f'Tearing down temporary Ansible '
                              f'execution context at {tmp_dir}')
+
+    def persistent(self,
+                   inventory: Mapping,
+                   ssh_key: Optional[Union[os.PathLike, str]] = None,
+                   **extravars: Any) -> Path:
+        """
+        Creates a long-lived environment to use in combination with
+        ansible-runner, for callers which run many playbooks in a row and
+        want to avoid setting up a new environment for each of them.
+        Subsequent runs only need to update the inventory through
+        write_inventory().
+
+        The environment is removed by remove_persistent(), or otherwise when
+        the interpreter exits.
+
+        Parameters
+        ----------
+        inventory
+            The initial inventory to use in this environment.
+        ssh_key
+            Specify the SSH key file to use for this environment.
+        extravars
+            Extravar overrides.
+
+        Returns
+        -------
+        Path
+            A Path object pointing to the Ansible environment.
+        """
+
+        env_dir = Path(tempfile.mkdtemp())
+        _persistent_dirs.add(env_dir)
+        self._populate(env_dir, inventory, ssh_key, extravars)
+
+        logger.debug(f'Created persistent Ansible '
+                     f'execution context at {env_dir}')
+        return env_dir
+
+    @staticmethod
+    def remove_persistent(env_dir: Path) -> None:
+        """
+        Removes an environment created by persistent().
+
+        Parameters
+        ----------
+        env_dir
+            Path to the Ansible environment.
+        """
+        _persistent_dirs.discard(env_dir)
+        shutil.rmtree(env_dir, ignore_errors=True)
+        logger.debug(f'Removed persistent Ansible '
+                     f'execution context at {env_dir}')
+
+    def environment(self,
+                    reuse: bool = False,
+                    batch_size: Optional[int] = None,
+                    **extravars: Any) -> 'AnsibleEnvironment':
+        """
+        Binds a set of extravars to this context, for callers which run
+        several playbooks with the same settings.
+
+        Parameters
+        ----------
+        reuse
+            Reuse a single persistent environment per SSH key for all runs,
+            only rewriting its inventory, instead of creating a temporary
+            environment for each run.
+        batch_size
+            Optional maximum number of hosts the playbooks configure
+            concurrently, passed on to them as the `batch_size` extravar.
+        extravars
+            Extravar overrides.
+
+        Returns
+        -------
+        AnsibleEnvironment
+            The bound environment.
+        """
+        if batch_size is not None:
+            if batch_size < 1:
+                raise ValueError('Batch size must be a positive integer.')
+            extravars['batch_size'] = batch_size
+        return AnsibleEnvironment(self, reuse, extravars)
+
+    @staticmethod
+    def write_inventory(env_dir: Path, inventory: Mapping) -> None:
+        """
+        (Over)writes the inventory of an Ansible environment. Nothing is
+        written if the environment already holds the same inventory.
+
+        Parameters
+        ----------
+        env_dir
+            Path to the Ansible environment.
+        inventory
+            The inventory to write.
+        """
+
+        # Ansible reads JSON inventories natively, and orjson is much
+        # faster than PyYAML for this.
+        data = orjson.dumps(inventory)
+
+        # the hash marker lives outside the inventory dir, so that Ansible
+        # doesn't try to parse it
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        marker = env_dir / '.inventory_hash'
+        try:
+            if marker.read_bytes() == digest:
+                return
+        except FileNotFoundError:
+            pass
+
+        inv_dir = env_dir / 'inventory'
+        inv_dir.mkdir(parents=True, exist_ok=True)
+        (inv_dir / 'hosts.json').write_bytes(data)
+        marker.write_bytes(digest)
+
+    def _populate(self,
+                  env_dir: Path,
+                  inventory: Mapping,
+                  ssh_key: Optional[Union[os.PathLike, str]],
+                  extravars: Mapping[str, Any]) -> None:
+        # set up the file structure ansible-runner expects,
+        # inside the env dir
+        os.symlink(self._proj_dir, env_dir / 'project')
+        # os.symlink(self._env_dir, env_dir / 'env')
+        shutil.copytree(self._env_dir, env_dir / 'env')
+
+        # potentially override some extravars
+        extravars_file = ((env_dir / 'env') / 'extravars')
+        try:
+            with extravars_file.open('r') as fp:
+                orig_extravars = yaml.safe_load(fp)
+            if orig_extravars is None:
+                orig_extravars = {}
+            elif not isinstance(orig_extravars, Dict):
+                raise RuntimeError('Ansible extravars file should be an '
+                                   'YAML file containing a mapping!')
+        except FileNotFoundError:
+            orig_extravars = {}
+
+        orig_extravars.update(extravars)
+        with extravars_file.open('w') as fp:
+            yaml.safe_dump(orig_extravars, stream=fp)
+
+        # if using a custom ssh key, copy it to the env dir
+        if ssh_key is not None:
+            ssh_key = Path(ssh_key).resolve()
+            ssh_key_path = env_dir / 'env' / 'ssh_key'
+            shutil.copy(ssh_key, ssh_key_path)
+            os.chmod(ssh_key_path, 0o600)
+
+        # make an inventory dir and dump the dict
+        self.write_inventory(env_dir, inventory)
+
+
+class AnsibleEnvironment:
+    """
+    Ansible environments with a fixed set of extravars, as returned by
+    AnsibleContext.environment().
+
+    Usage example::
+
+        ansible_env = ansible_ctx.environment(reuse=True)
+        ...
+        with ansible_env(inventory) as env_dir:
+                ansible_runner.run(
+                    playbook='test.yml',
+                    private_data_dir=str(env_dir)
+                )
+        ...
+        ansible_env.close()
+    """
+
+    def __init__(self,
+                 ansible_ctx: AnsibleContext,
+                 reuse: bool,
+                 extravars: Mapping[str, Any]):
+        self._ansible_ctx = ansible_ctx
+        self._reuse = reuse
+        self._extravars = dict(extravars)
+
+        # persistent environments by ssh key, when reusing them
+        self._workdirs: Dict[Optional[str], Path] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self,
+                 inventory: Mapping,
+                 ssh_key: Optional[Union[os.PathLike, str]] = None) \
+            -> Generator[Path, None, None]:
+        """
+        Provides an environment with the given inventory and SSH key to use
+        in combination with ansible-runner.
+
+        Parameters
+        ----------
+        inventory
+            The inventory to use in this environment.
+        ssh_key
+            Specify the SSH key file to use for this environment.
+
+        Returns
+        -------
+        Path
+            A Path object pointing to the Ansible environment.
+        """
+        if not self._reuse:
+            with self._ansible_ctx(inventory=inventory,
+                                   ssh_key=ssh_key,
+                                   **self._extravars) as tmp_dir:
+                yield tmp_dir
+            return
+
+        key = None if ssh_key is None else str(ssh_key)
+        with self._lock:
+            workdir = self._workdirs.get(key)
+            if workdir is None:
+                workdir = self._ansible_ctx.persistent(inventory, ssh_key,
+                                                       **self._extravars)
+                self._workdirs[key] = workdir
+            else:
+                AnsibleContext.write_inventory(workdir, inventory)
+        yield workdir
+
+    def close(self) -> None:
+        """
+        Removes the persistent environments created so far. New ones are
+        created if this object is used again afterwards.
+        """
+        with self._lock:
+            for workdir in self._workdirs.values():
+                AnsibleContext.remove_persistent(workdir)
+            self._workdirs.clear()
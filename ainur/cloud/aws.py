@@ -22,13 +22,11 @@ from ipaddress import IPv4Address
 from types import TracebackType
 from typing import Any, Collection, Dict, Iterator, Mapping, \
     Set, \
-    Type, overload
+    TYPE_CHECKING, Type, overload
 
 import boto3
 from botocore.exceptions import ClientError
 from loguru import logger
-from mypy_boto3_ec2.service_resource import Instance, SecurityGroup
-from mypy_boto3_ec2.type_defs import IpPermissionTypeDef, IpRangeTypeDef
 
 from .errors import CloudError, RevokedKeyError
 from .instances import spawn_instances, \
@@ -36,9 +34,16 @@ from .instances import spawn_instances, \
 from .keys import AWSKeyPair, AWSNullKeyPair
 from .security_groups import create_security_group
 
+if TYPE_CHECKING:
+    # the boto3 stubs are large and only needed for type checking
+    from mypy_boto3_ec2.service_resource import Instance, SecurityGroup
+    from mypy_boto3_ec2.type_defs import IpPermissionTypeDef
+
 
 @dataclass(frozen=True, eq=True)
 class EC2Host:
+    __slots__ = ('instance_id', 'public_ip', 'vpc_ip', 'key_file')
+
     instance_id: str
     public_ip: IPv4Address
     vpc_ip: IPv4Address
@@ -214,12 +219,12 @@ class CloudInstances(AbstractContextManager, Mapping[str, EC2Host]):
                 ephemeral=True,
                 attach_to_instances=False,
                 ingress_rules=[
-                    IpPermissionTypeDef(
-                        FromPort=22,
-                        ToPort=22,
-                        IpProtocol='tcp',
-                        IpRanges=[IpRangeTypeDef(CidrIp='0.0.0.0/0')]
-                    )
+                    {
+                        'FromPort'  : 22,
+                        'ToPort'    : 22,
+                        'IpProtocol': 'tcp',
+                        'IpRanges'  : [{'CidrIp': '0.0.0.0/0'}]
+                    }
                 ]
             )
             self._ssh_sec_groups.add(ssh_sgid)
@@ -18,14 +18,16 @@ from __future__ import annotations
 import socket
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Collection, Iterable, List
+from typing import Collection, Iterable, List, TYPE_CHECKING
 
 import boto3
 from loguru import logger
-from mypy_boto3_ec2.service_resource import Instance
 
 from .errors import CloudError
 
+if TYPE_CHECKING:
+    from mypy_boto3_ec2.service_resource import Instance
+
 
 def _wait_instances_up(instances: Collection[Instance],
                        startup_timeout_s: int,
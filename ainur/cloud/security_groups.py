@@ -15,15 +15,17 @@
 
 from __future__ import annotations
 
-from typing import Collection
+from typing import Collection, TYPE_CHECKING
 
 import boto3
 from loguru import logger
-from mypy_boto3_ec2.service_resource import SecurityGroup, Vpc
-from mypy_boto3_ec2.type_defs import IpPermissionTypeDef, IpRangeTypeDef
 
 from .errors import CloudError
 
+if TYPE_CHECKING:
+    from mypy_boto3_ec2.service_resource import SecurityGroup, Vpc
+    from mypy_boto3_ec2.type_defs import IpPermissionTypeDef
+
 
 def create_security_group(name: str,
                           desc: str,
@@ -37,15 +39,14 @@ def create_security_group(name: str,
 
     ec2 = boto3.resource('ec2', region_name=region)
     ec2_client = boto3.client('ec2', region_name=region)
-    vpc: Vpc = list(ec2.vpcs.all())[0]
+    # only the first vpc is used, no need to list all of them
+    vpc: Vpc = next(iter(ec2.vpcs.all()))
 
     ingress_rules = list(ingress_rules)
     egress_rules = list(egress_rules)
 
     # allow traffic to flow freely outwards
-    egress_rules.append(
-        IpPermissionTypeDef(IpProtocol='-1')
-    )
+    egress_rules.append({'IpProtocol': '-1'})
 
     try:
         sec_group = ec2.create_security_group(
@@ -80,9 +81,9 @@ def create_security_group(name: str,
         ) from e
 
 
-ssh_ingress_rule = IpPermissionTypeDef(
-    FromPort=22,
-    ToPort=22,
-    IpProtocol='tcp',
-    IpRanges=[IpRangeTypeDef(CidrIp='0.0.0.0/0')]
-)
+ssh_ingress_rule: IpPermissionTypeDef = {
+    'FromPort'  : 22,
+    'ToPort'    : 22,
+    'IpProtocol': 'tcp',
+    'IpRanges'  : [{'CidrIp': '0.0.0.0/0'}]
+}
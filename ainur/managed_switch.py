@@ -18,11 +18,12 @@ from __future__ import annotations
 import json
 import re
 from collections import defaultdict
-from contextlib import AbstractContextManager
+from contextlib import AbstractContextManager, contextmanager
 from dataclasses import dataclass
 from ipaddress import IPv4Interface
 from operator import attrgetter
-from typing import Collection, Dict, FrozenSet, List, Tuple
+from typing import Collection, Dict, FrozenSet, Generator, List, Optional, \
+    Tuple
 
 import pexpect
 from loguru import logger
@@ -59,7 +60,8 @@ class ManagedSwitch(AbstractContextManager):
                  timeout: int):
 
         # we do login - logout for every command since there is a timeout for
-        # each login session on the cisco switch
+        # each login session on the cisco switch, except for batches of
+        # commands issued within a session() block
 
         self._name = name
         self._address = address
@@ -71,6 +73,9 @@ class ManagedSwitch(AbstractContextManager):
         # Third argument is assigned to the variable password
         self._password = credentials[1]
 
+        # currently open telnet session, if any
+        self._child: Optional[pexpect.spawn] = None
+
         logger.info('Contacting the network switch.')
 
         # update vlans table
@@ -122,6 +127,28 @@ class ManagedSwitch(AbstractContextManager):
         child.send("exit\n")
         child.expect(pexpect.EOF)
 
+    @contextmanager
+    def session(self) -> Generator[pexpect.spawn, None, None]:
+        """
+        Provides a logged-in telnet session to the switch, which is logged
+        out of on exit. Nested sessions reuse the outermost one, so that
+        batches of commands can be issued over a single login.
+        """
+        if self._child is not None:
+            yield self._child
+            return
+
+        self._child = self.login()
+        try:
+            yield self._child
+        except BaseException:
+            self._child.close(force=True)
+            raise
+        else:
+            self.logout(self._child)
+        finally:
+            self._child = None
+
     def make_connections(self,
                          hosts: Dict[str, LocalAinurHost],
                          radios: Collection[SoftwareDefinedRadio]) -> None:
@@ -137,12 +164,14 @@ class ManagedSwitch(AbstractContextManager):
         for radio in radios:
             vlans_ports[radio.net_name].add(radio.switch_port)
 
-        for wired_net_name, ports in vlans_ports.items():
-            try:
-                self.make_vlan(ports=list(ports), name=wired_net_name)
-            except SwitchError:
-                logger.debug(f'VLAN {wired_net_name} was not created since no '
-                             f'ports were assigned to it.')
+        # create all the vlans over a single login
+        with self.session():
+            for wired_net_name, ports in vlans_ports.items():
+                try:
+                    self.make_vlan(ports=list(ports), name=wired_net_name)
+                except SwitchError:
+                    logger.debug(f'VLAN {wired_net_name} was not created since '
+                                 f'no ports were assigned to it.')
 
     def update_vlans(self):
         logger.debug('Updating VLANs.')
@@ -230,38 +259,37 @@ class ManagedSwitch(AbstractContextManager):
         logger.debug(f'Creating new VLAN {name} ({vlanid=}) '
                      f'spanning ports {ports}.')
 
-        child = self.login()
+        with self.session() as child:
+            # go to config mode
+            child.send("configure terminal\n")
+            child.expect_exact(self._name + '(config)#')
 
-        # go to config mode
-        child.send("configure terminal\n")
-        child.expect_exact(self._name + '(config)#')
+            child.send("vlan %d\n" % vlanid)
 
-        child.send("vlan %d\n" % vlanid)
+            child.expect_exact(self._name + "(config-vlan)#")
+            child.send("name %s\n" % name)
 
-        child.expect_exact(self._name + "(config-vlan)#")
-        child.send("name %s\n" % name)
+            child.expect_exact(self._name + "(config-vlan)#")
+            child.send("exit\n")
 
-        child.expect_exact(self._name + "(config-vlan)#")
-        child.send("exit\n")
+            for portnum in ports:
+                child.expect_exact(self._name + "(config)#")
+                child.send("interface gi%d\n" % portnum)
 
-        for portnum in ports:
-            child.expect_exact(self._name + "(config)#")
-            child.send("interface gi%d\n" % portnum)
+                child.expect_exact(self._name + "(config-if)")
+                child.send("switchport mode access\n")
 
-            child.expect_exact(self._name + "(config-if)")
-            child.send("switchport mode access\n")
+                child.expect_exact(self._name + "(config-if)")
+                child.send("switchport access vlan %d\n" % vlanid)
 
-            child.expect_exact(self._name + "(config-if)")
-            child.send("switchport access vlan %d\n" % vlanid)
+                child.expect_exact(self._name + "(config-if)")
+                child.send("exit\n")
 
-            child.expect_exact(self._name + "(config-if)")
-            child.send("exit\n")
-
-        child.expect_exact(self._name + '(config)#')
+            child.expect_exact(self._name + '(config)#')
 
-        # go back to login mode
-        child.send("exit\n")
-        child.expect_exact(self._name + "#")
+            # go back to login mode
+            child.send("exit\n")
+            child.expect_exact(self._name + "#")
 
         new_vlan = Vlan(name=name, id_num=vlanid, ports=ports,
                         switch_name=self._name, default=False)
@@ -271,46 +299,41 @@ class ManagedSwitch(AbstractContextManager):
 
     def hard_remove_vlan(self, id_num: int):
 
-        child = self.login()
+        with self.session() as child:
+            # go to config mode
+            child.send("configure terminal\n")
+            child.expect_exact(self._name + '(config)#')
 
-        # go to config mode
-        child.send("configure terminal\n")
-        child.expect_exact(self._name + '(config)#')
+            # remove it
+            child.send("no vlan %d\n" % id_num)
+            child.expect_exact(self._name + "(config)")
 
-        # remove it
-        child.send("no vlan %d\n" % id_num)
-        child.expect_exact(self._name + "(config)")
-
-        # go back to login mode
-        child.send("exit\n")
-        child.expect_exact(self._name + "#")
-
-        self.logout(child)
+            # go back to login mode
+            child.send("exit\n")
+            child.expect_exact(self._name + "#")
 
         logger.warning(f'Workload switch VLAN ({id_num=}) has been removed.')
 
     def remove_vlan(self, id_num: int):
-        vlan = [vl for vl in self._vlans if vl.id_num == id_num]
-        if len(vlan) == 0:
+        vlan = next((vl for vl in self._vlans if vl.id_num == id_num), None)
+        if vlan is None:
             logger.warning(
                 f'Tried to remove non-existing VLAN ({id_num=}).'
             )
             return
-        vlan = vlan[0]
-
-        child = self.login()
 
-        # go to config mode
-        child.send("configure terminal\n")
-        child.expect_exact(self._name + '(config)#')
+        with self.session() as child:
+            # go to config mode
+            child.send("configure terminal\n")
+            child.expect_exact(self._name + '(config)#')
 
-        # remove it
-        child.send("no vlan %d\n" % id_num)
-        child.expect_exact(self._name + "(config)")
+            # remove it
+            child.send("no vlan %d\n" % id_num)
+            child.expect_exact(self._name + "(config)")
 
-        # go back to login mode
-        child.send("exit\n")
-        child.expect_exact(self._name + "#")
+            # go back to login mode
+            child.send("exit\n")
+            child.expect_exact(self._name + "#")
 
         self._vlans.remove(vlan)
         logger.warning(f'Workload switch VLAN ({id_num=}) has been removed.')
@@ -325,9 +348,10 @@ class ManagedSwitch(AbstractContextManager):
 
         non_defalut_vlan_ids = [vl.id_num for vl in self._vlans if
                                 vl.default == False]
-        # remove all non default vlans
-        for nd_id_num in non_defalut_vlan_ids:
-            self.remove_vlan(nd_id_num)
+        # remove all non default vlans, over a single login
+        with self.session():
+            for nd_id_num in non_defalut_vlan_ids:
+                self.remove_vlan(nd_id_num)
 
         logger.warning('Workload switch non default vlans removed.')
 
@@ -336,4 +360,4 @@ class ManagedSwitch(AbstractContextManager):
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
         self.tear_down()
-        return super(ManagedSwitch, self).__exit__(exc_type, exc_val, exc_tb)
+        return False
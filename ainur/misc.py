@@ -18,9 +18,17 @@ from __future__ import annotations
 
 import threading
 from contextlib import contextmanager
-from typing import Callable, Dict, Generator, NamedTuple, Optional, Tuple
+from typing import Any, Callable, Dict, Generator, NamedTuple, Optional, \
+    TYPE_CHECKING, Tuple
 
-from docker import DockerClient
+import orjson
+import yaml
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+# use the libyaml parser when pyyaml was built with it
+YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 @contextmanager
@@ -42,11 +50,38 @@ def docker_client_context(*args, **kwargs) \
     DockerClient
         An initialized Docker client instance.
     """
+    # docker is only imported when needed, since the rest of this module is
+    # used in places which don't need it
+    from docker import DockerClient
+
     client = DockerClient(*args, **kwargs)
     yield client
     client.close()
 
 
+def dump_json(obj: Any, pretty: bool = False) -> str:
+    """
+    Fast JSON serialization, mainly for logging. Objects which are not
+    natively serializable (e.g. IP addresses) are converted to strings.
+
+    Parameters
+    ----------
+    obj
+        Object to serialize.
+    pretty
+        Indent the output.
+
+    Returns
+    -------
+    str
+        The JSON representation of the object.
+    """
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=str, option=option).decode()
+
+
 def ceildiv(a: int, b: int) -> int:
     """
     Ceiling division, such that c = a/b is rounded to the next whole integer.
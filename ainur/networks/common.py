@@ -16,6 +16,9 @@
 from __future__ import annotations
 
 import abc
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import AbstractContextManager, ExitStack
 from types import TracebackType
 from typing import Any, Iterator, List, Mapping, Type, TypeVar, overload
@@ -109,10 +112,32 @@ class CompositeLayer3Network(Layer3Network):
         return self
 
     def tear_down(self) -> None:
-        self._stack.close()
-        self._stack = ExitStack()
+        # sub-networks are independent of each other, so instead of unwinding
+        # the exit stack serially we tear them down concurrently.
+        self._stack.pop_all()
+
+        with ThreadPoolExecutor() as tpool:
+            # tear down is dominated by Ansible subprocesses, threads suffice
+            exc_lock = threading.RLock()
+            caught_exceptions = deque()
+
+            def _tear_down(net: Layer3Network) -> None:
+                try:
+                    net.tear_down()
+                except Exception as e:
+                    with exc_lock:
+                        caught_exceptions.append(e)
+
+            # NOTE: ThreadPoolExecutor.map does not block; exiting the with
+            # block waits for all the tear downs to finish.
+            tpool.map(_tear_down, self._networks)
+
         self._networks.clear()
 
+        if len(caught_exceptions) > 0:
+            raise Layer3Error('Could not tear down all sub-networks.') \
+                from caught_exceptions.pop()
+
     def __iter__(self) -> Iterator[str]:
         for net in self._networks:
             for hostname in net:
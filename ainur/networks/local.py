@@ -15,8 +15,8 @@
 
 from __future__ import annotations
 
-import json
-from typing import Any, Iterator, Mapping
+from typing import Any, Dict, Iterator, Mapping, Optional, TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
 import ansible_runner
 from frozendict import frozendict
@@ -25,7 +25,25 @@ from loguru import logger
 from .common import Layer3Error, Layer3Network
 from ..ansible import AnsibleContext
 from ..hosts import LocalAinurHost
-from ..physical import PhysicalLayer
+from ..misc import dump_json
+
+if TYPE_CHECKING:
+    # only needed for annotations; importing it at runtime would pull in the
+    # switch and SDR machinery (pexpect, docker) for every network
+    from ..physical import PhysicalLayer
+
+
+# Netplan configs are fully determined by the (immutable) host definitions,
+# so we cache them instead of regenerating them on every bring up and tear down.
+_netplan_cache: WeakKeyDictionary[LocalAinurHost, str] = WeakKeyDictionary()
+
+
+def _netplan_yaml(host: LocalAinurHost) -> str:
+    cfg = _netplan_cache.get(host)
+    if cfg is None:
+        cfg = host.gen_netplan_config().to_netplan_yaml()
+        _netplan_cache[host] = cfg
+    return cfg
 
 
 # TODO: needs testing
@@ -43,16 +61,50 @@ class LANLayer(Layer3Network):
 
     def __init__(self,
                  ansible_context: AnsibleContext,
-                 ansible_quiet: bool = True):
+                 ansible_quiet: bool = True,
+                 batch_size: Optional[int] = None,
+                 reuse_workdir: bool = False):
         """
         ansible_context:
             Ansible context to use.
         ansible_quiet:
             Quiet Ansible output.
+        batch_size:
+            Optional maximum number of hosts to configure concurrently.
+            Maps to the Ansible `serial` play keyword; by default all hosts
+            are configured in a single batch.
+        reuse_workdir:
+            Reuse a single Ansible environment for all the playbook runs of
+            this network instead of creating a temporary one for each run.
         """
         self._ansible_context = ansible_context
         self._ansible_quiet = ansible_quiet
         self._connected_hosts = {}
+        # frozen view of the connected hosts, rebuilt only after changes
+        self._hosts_view: Optional[frozendict[str, LocalAinurHost]] = None
+
+        self._ansible_env = ansible_context.environment(
+            reuse=reuse_workdir,
+            batch_size=batch_size
+        )
+
+    @staticmethod
+    def _build_inventory(hosts: Mapping[str, LocalAinurHost]) \
+            -> Dict[str, Any]:
+        # build an Ansible inventory from the hosts
+        return {
+            'all': {
+                'hosts': {
+                    name: {
+                        'ansible_host': host.ansible_host,
+                        'ansible_user': host.ansible_user,
+                        'netplan_cfg' : _netplan_yaml(host),
+                        'interfaces'  : host.interface_names
+                    }
+                    for name, host in hosts.items()
+                }
+            }
+        }
 
     def add_hosts(self, layer2: PhysicalLayer) -> LANLayer:
         """
@@ -68,44 +120,33 @@ class LANLayer(Layer3Network):
         """
         logger.info('Configuring layer 3 connections.')
 
-        host_info = '\n'.join([json.dumps({n: h.to_dict()},
-                                          ensure_ascii=False,
-                                          indent=2)
-                               for n, h in layer2.items()])
-
-        logger.debug(f'Layer 2 hosts:\n{host_info}')
+        # lazy logging, so that we only serialize if debug logging is enabled
+        logger.opt(lazy=True).debug(
+            'Layer 2 hosts:\n{}',
+            lambda: dump_json({n: h.to_dict() for n, h in layer2.items()},
+                              pretty=True)
+        )
 
-        # build an Ansible inventory from the hosts
-        # TODO: make a function to automate this pls
-        inventory = {
-            'all': {
-                'hosts': {
-                    name: {
-                        'ansible_host': host.ansible_host,
-                        'ansible_user': host.ansible_user,
-                        'netplan_cfg' : host
-                            .gen_netplan_config()
-                            .to_netplan_yaml(),
-                        'interfaces'  : host.interface_names
-                    }
-                    for name, host in layer2.items()
-                }
-            }
-        }
+        inventory = self._build_inventory(layer2)
 
-        logger.debug(
-            'Configuring network layer with the following Ansible inventory:\n'
-            f'{json.dumps(inventory, indent=2, ensure_ascii=False)}'
+        logger.opt(lazy=True).debug(
+            'Configuring network layer with the following Ansible '
+            'inventory:\n{}',
+            lambda: dump_json(inventory, pretty=True)
         )
 
         # prepare a temp ansible environment and run the appropriate playbook
-        with self._ansible_context(inventory) as tmp_dir:
+        with self._ansible_env(inventory) as tmp_dir:
             logger.info('Bringing up the network.')
             res = ansible_runner.run(
                 playbook='net_up.yml',
                 json_mode=False,
                 private_data_dir=str(tmp_dir),
                 quiet=self._ansible_quiet,
+                # don't let artifacts pile up in reused environments
+                rotate_artifacts=1,
+                # hosts are configured independently, so do them all at once
+                forks=self._ansible_context.forks(len(layer2)),
             )
 
         if res.status == 'failed':
@@ -116,6 +157,7 @@ class LANLayer(Layer3Network):
             # network is now up and running
 
         self._connected_hosts.update(layer2)
+        self._hosts_view = None
         return self
 
     def __iter__(self) -> Iterator[str]:
@@ -132,32 +174,25 @@ class LANLayer(Layer3Network):
 
     @property
     def hosts(self) -> frozendict[str, LocalAinurHost]:
-        return frozendict(self._connected_hosts)
+        if self._hosts_view is None:
+            self._hosts_view = frozendict(self._connected_hosts)
+        return self._hosts_view
 
     def _tear_down(self, hosts: Mapping[str, LocalAinurHost]):
-        # build an Ansible inventory from the hosts
-        inventory = {
-            'all': {
-                'hosts': {
-                    name: {
-                        'ansible_host': host.ansible_host,
-                        'ansible_user': host.ansible_user,
-                        'netplan_cfg' : host
-                            .gen_netplan_config()
-                            .to_netplan_yaml(),
-                        'interfaces'  : host.interface_names
-                    }
-                    for name, host in hosts.items()
-                }
-            }
-        }
+        if not hosts:
+            # nothing to tear down, don't pay for an Ansible run
+            return
+
+        inventory = self._build_inventory(hosts)
 
-        with self._ansible_context(inventory) as tmp_dir:
+        with self._ansible_env(inventory) as tmp_dir:
             res = ansible_runner.run(
                 playbook='net_down.yml',
                 json_mode=False,
                 private_data_dir=str(tmp_dir),
                 quiet=self._ansible_quiet,
+                rotate_artifacts=1,
+                forks=self._ansible_context.forks(len(hosts)),
             )
 
         # TODO: better error checking
@@ -173,8 +208,12 @@ class LANLayer(Layer3Network):
 
         # prepare a temp ansible environment and run the appropriate playbook
         logger.warning('Tearing down Layer3 connectivity!')
-        self._tear_down(self._connected_hosts)
+        try:
+            self._tear_down(self._connected_hosts)
+        finally:
+            self._ansible_env.close()
         self._connected_hosts.clear()
+        self._hosts_view = None
         logger.warning('Layer 3 has been torn down.')
 
     def __enter__(self) -> LANLayer:
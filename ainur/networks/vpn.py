@@ -16,20 +16,35 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from ipaddress import IPv4Address, IPv4Interface, IPv4Network
-from typing import Any, Collection, DefaultDict, Dict, Iterator, Set, \
-    Tuple
+from typing import Any, Collection, DefaultDict, Dict, Iterable, Iterator, \
+    List, Mapping, Optional, Set, Tuple, TYPE_CHECKING
 
 import ansible_runner
-import yaml
 from loguru import logger
-from mypy_boto3_ec2.type_defs import IpPermissionTypeDef, IpRangeTypeDef
 
 from .common import Layer3Network
 from ..ansible import AnsibleContext
 from ..cloud.aws import CloudInstances, EC2Host
 from ..hosts import AinurCloudHost, AinurCloudHostConfig
+from ..misc import dump_json
+
+if TYPE_CHECKING:
+    from mypy_boto3_ec2.type_defs import IpRangeTypeDef
+
+# source range shared by all the ingress rules of the VPN security group
+_ANYWHERE: List[IpRangeTypeDef] = [
+    {'CidrIp': '0.0.0.0/0', 'Description': 'Everywhere'}
+]
+
+
+@lru_cache(maxsize=1024)
+def _peer_addr(ip: IPv4Address, port: int) -> str:
+    # the same peers are announced to every new host in the mesh
+    return f'{ip}:{port}'
 
 
 class VPNConfigError(Exception):
@@ -38,6 +53,8 @@ class VPNConfigError(Exception):
 
 @dataclass(frozen=True, eq=True)
 class _MeshConfig:
+    __slots__ = ('ip', 'psk', 'port', 'local_net')
+
     ip: IPv4Interface
     psk: str
     port: int
@@ -46,41 +63,83 @@ class _MeshConfig:
 
 @dataclass(frozen=True, eq=True)
 class _Gateway:
+    # the gateway is immutable, so we precompute the string forms used in
+    # host inventories; these are plain slots, not dataclass fields
+    __slots__ = ('public_ip', 'mgmt_cfg', 'wkld_cfg',
+                 'mgmt_ip_str', 'mgmt_net_str', 'wkld_ip_str', 'wkld_net_str')
+
     public_ip: IPv4Address
     mgmt_cfg: _MeshConfig
     wkld_cfg: _MeshConfig
 
+    def __post_init__(self):
+        object.__setattr__(self, 'mgmt_ip_str', str(self.mgmt_cfg.ip.ip))
+        object.__setattr__(self, 'mgmt_net_str',
+                           str(self.mgmt_cfg.local_net))
+        object.__setattr__(self, 'wkld_ip_str', str(self.wkld_cfg.ip.ip))
+        object.__setattr__(self, 'wkld_net_str',
+                           str(self.wkld_cfg.local_net))
+
     @property
     def mgmt_peer_addr(self) -> str:
-        return f'{self.public_ip}:{self.mgmt_cfg.port}'
+        return _peer_addr(self.public_ip, self.mgmt_cfg.port)
 
     @property
     def wkld_peer_addr(self) -> str:
-        return f'{self.public_ip}:{self.wkld_cfg.port}'
+        return _peer_addr(self.public_ip, self.wkld_cfg.port)
 
     def gen_peer_configs(self, peer: IPv4Address) -> Tuple[str, str]:
-        return (
-            f'{peer}:{self.mgmt_cfg.port}',
-            f'{peer}:{self.wkld_cfg.port}'
-        )
+        return (_peer_addr(peer, self.mgmt_cfg.port),
+                _peer_addr(peer, self.wkld_cfg.port))
 
 
 @dataclass
 class _VPNCloudHostCfg:
+    # peers and cached values are plain slots set up in __post_init__, as
+    # dataclass fields with defaults can't be combined with __slots__
+    __slots__ = ('ec2host', 'ainur_config', 'gateway',
+                 'mgmt_peers', 'wkld_peers', '_inventory',
+                 '_public_ip_str', '_mgmt_ip_str', '_wkld_ip_str')
+
     ec2host: EC2Host
     ainur_config: AinurCloudHostConfig
     gateway: _Gateway
-    mgmt_peers: Set[str] = field(init=False, default_factory=set)
-    wkld_peers: Set[str] = field(init=False, default_factory=set)
 
     def __post_init__(self):
-        self.mgmt_peers.add(self.gateway.mgmt_peer_addr)
-        self.wkld_peers.add(self.gateway.wkld_peer_addr)
+        # dicts used as insertion-ordered sets, so that inventories are stable
+        self.mgmt_peers: Dict[str, None] = {}
+        self.wkld_peers: Dict[str, None] = {}
+
+        # inventory dump is only invalidated when peers change
+        self._inventory: Optional[Dict[str, Any]] = None
+
+        # string forms of the (immutable) host addresses, for the inventory
+        self._public_ip_str = str(self.ec2host.public_ip)
+        self._mgmt_ip_str = str(self.ainur_config.management_ip)
+        self._wkld_ip_str = str(self.ainur_config.workload_ip)
+        self.mgmt_peers[self.gateway.mgmt_peer_addr] = None
+        self.wkld_peers[self.gateway.wkld_peer_addr] = None
 
     def add_peer(self, peer: IPv4Address) -> None:
-        mgmt_peer, wkld_peer = self.gateway.gen_peer_configs(peer)
-        self.mgmt_peers.add(mgmt_peer)
-        self.wkld_peers.add(wkld_peer)
+        self.add_peers((self.gateway.gen_peer_configs(peer),))
+
+    def add_peers(self, peer_configs: Iterable[Tuple[str, str]]) -> None:
+        # peer_configs as generated by _Gateway.gen_peer_configs()
+        for mgmt_peer, wkld_peer in peer_configs:
+            self.mgmt_peers[mgmt_peer] = None
+            self.wkld_peers[wkld_peer] = None
+        self._inventory = None
+
+    def save_peers(self) -> Tuple[Dict[str, None], Dict[str, None]]:
+        return dict(self.mgmt_peers), dict(self.wkld_peers)
+
+    def restore_peers(self,
+                      saved: Tuple[Dict[str, None], Dict[str, None]]) -> None:
+        # saved as returned by save_peers()
+        mgmt_peers, wkld_peers = saved
+        self.mgmt_peers = dict(mgmt_peers)
+        self.wkld_peers = dict(wkld_peers)
+        self._inventory = None
 
     def to_ainur_host(self) -> AinurCloudHost:
         return AinurCloudHost(
@@ -92,31 +151,33 @@ class _VPNCloudHostCfg:
         )
 
     def dump_ansible_inventory(self) -> Dict[str, Any]:
-        return {
-            'ansible_host'                : str(self.ec2host.public_ip),
-            'ansible_user'                : self.ainur_config.ansible_user,
-            'ansible_ssh_private_key_file': self.ec2host.key_file,
-            'vpn_configs'                 : {
-                'management': {
-                    'dev_name': 'vpn_mgmt',
-                    'port'    : self.gateway.mgmt_cfg.port,
-                    'peers'   : list(self.mgmt_peers),
-                    'psk'     : self.gateway.mgmt_cfg.psk,
-                    'ip'      : str(self.ainur_config.management_ip),
-                    'gw_ip'   : str(self.gateway.mgmt_cfg.ip.ip),
-                    'gw_net'  : str(self.gateway.mgmt_cfg.local_net)
+        if self._inventory is None:
+            self._inventory = {
+                'ansible_host'                : self._public_ip_str,
+                'ansible_user'                : self.ainur_config.ansible_user,
+                'ansible_ssh_private_key_file': self.ec2host.key_file,
+                'vpn_configs'                 : {
+                    'management': {
+                        'dev_name': 'vpn_mgmt',
+                        'port'    : self.gateway.mgmt_cfg.port,
+                        'peers'   : list(self.mgmt_peers),
+                        'psk'     : self.gateway.mgmt_cfg.psk,
+                        'ip'      : self._mgmt_ip_str,
+                        'gw_ip'   : self.gateway.mgmt_ip_str,
+                        'gw_net'  : self.gateway.mgmt_net_str
+                    },
+                    'workload'  : {
+                        'dev_name': 'vpn_wkld',
+                        'port'    : self.gateway.wkld_cfg.port,
+                        'peers'   : list(self.wkld_peers),
+                        'psk'     : self.gateway.wkld_cfg.psk,
+                        'ip'      : self._wkld_ip_str,
+                        'gw_ip'   : self.gateway.wkld_ip_str,
+                        'gw_net'  : self.gateway.wkld_net_str
+                    }
                 },
-                'workload'  : {
-                    'dev_name': 'vpn_wkld',
-                    'port'    : self.gateway.wkld_cfg.port,
-                    'peers'   : list(self.wkld_peers),
-                    'psk'     : self.gateway.wkld_cfg.psk,
-                    'ip'      : str(self.ainur_config.workload_ip),
-                    'gw_ip'   : str(self.gateway.wkld_cfg.ip.ip),
-                    'gw_net'  : str(self.gateway.wkld_cfg.local_net)
-                }
-            },
-        }
+            }
+        return self._inventory
 
 
 class VPNCloudMesh(Layer3Network):
@@ -130,7 +191,9 @@ class VPNCloudMesh(Layer3Network):
                  mgmt_local_net: IPv4Network = IPv4Network('192.168.0.0/16'),
                  wkld_local_net: IPv4Network = IPv4Network('10.0.0.0/16'),
                  mgmt_port: int = 3210,
-                 wkld_port: int = 3211, ):
+                 wkld_port: int = 3211,
+                 batch_size: Optional[int] = None,
+                 reuse_workdir: bool = False):
         """
         Parameters
         ----------
@@ -154,6 +217,14 @@ class VPNCloudMesh(Layer3Network):
             Ansible context to use.
         ansible_quiet
             Quiet ansible output.
+        batch_size
+            Optional maximum number of hosts to configure concurrently.
+            Maps to the Ansible `serial` play keyword; by default all hosts
+            are configured in a single batch.
+        reuse_workdir
+            Reuse a single Ansible environment per keyfile for all the
+            playbook runs of this mesh, instead of creating a temporary one
+            for each run.
         """
 
         self._gateway = _Gateway(
@@ -172,16 +243,36 @@ class VPNCloudMesh(Layer3Network):
             )
         )
 
-        # dictionary of {keys: {hosts: hostcfgs}}
-        self._conn_hosts: DefaultDict[str, Dict[str, _VPNCloudHostCfg]] = \
-            defaultdict(dict)
+        # host ids grouped by the keyfile used to access them
+        self._ids_by_keyfile: DefaultDict[str, List[str]] = defaultdict(list)
 
+        # flat index of {host id: hostcfg} for O(1) lookups, also used to
         # keep track of individual instance ids to prevent clashes
-        self._host_ids = set()
+        self._host_index: Dict[str, _VPNCloudHostCfg] = {}
 
         self._ansible_ctx = ansible_ctx
         self._ansible_quiet = ansible_quiet
 
+        self._ansible_env = ansible_ctx.environment(
+            reuse=reuse_workdir,
+            batch_size=batch_size
+        )
+
+        # runs connect_cloud_async() calls, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _build_inventory(hosts: Mapping[str, _VPNCloudHostCfg]) \
+            -> Dict[str, Any]:
+        return {
+            'all': {
+                'hosts': {
+                    host_id: host_cfg.dump_ansible_inventory()
+                    for host_id, host_cfg in hosts.items()
+                }
+            }
+        }
+
     def connect_cloud(self,
                       cloud_layer: CloudInstances,
                       host_configs: Collection[AinurCloudHostConfig]):
@@ -209,31 +300,55 @@ class VPNCloudMesh(Layer3Network):
         logger.info(f'Connecting {cloud_layer} to VPN mesh.')
 
         # pair cloud instances with configs
-        cloud_hosts = {}
-        for (iid1, ec2host1), config1 in zip(cloud_layer.items(), host_configs):
-            if iid1 in self._host_ids:
+        pairings = list(zip(cloud_layer.items(), host_configs))
+        connected = list(self._host_index.values())
+
+        # validate the new hosts before building any peer configs
+        for (iid, _), _ in pairings:
+            if iid in self._host_index:
                 raise VPNConfigError('Attempting to configure VPN mesh on '
                                      'already-configured instance.')
 
+        # check for clashing IP assignments in a single pass, both among the
+        # new hosts and against the already-connected ones
+        # TODO: check networks?
+        seen_mgmt_ips = {h.ainur_config.management_ip.ip for h in connected}
+        seen_wkld_ips = {h.ainur_config.workload_ip.ip for h in connected}
+        for _, config in pairings:
+            mgmt_ip = config.management_ip.ip
+            wkld_ip = config.workload_ip.ip
+            if mgmt_ip in seen_mgmt_ips or wkld_ip in seen_wkld_ips:
+                raise VPNConfigError('Clashing IP address configuration for '
+                                     f'{config}.')
+            seen_mgmt_ips.add(mgmt_ip)
+            seen_wkld_ips.add(wkld_ip)
+
+        # peer addresses are generated once and shared by all new hosts;
+        # new hosts reach each other over the vpc and the already-connected
+        # ones over the internet
+        regional_peers = {
+            iid: self._gateway.gen_peer_configs(ec2host.vpc_ip)
+            for (iid, ec2host), _ in pairings
+        }
+        remote_peers = [
+            self._gateway.gen_peer_configs(host.ec2host.public_ip)
+            for host in connected
+        ]
+
+        cloud_hosts = {}
+        for (iid1, ec2host1), config1 in pairings:
             peer1 = _VPNCloudHostCfg(
                 ec2host=ec2host1,
                 ainur_config=config1,
                 gateway=self._gateway
             )
 
-            # regional peers
-            for (iid2, ec2host2), config2 in zip(cloud_layer.items(),
-                                                 host_configs):
-                if iid1 != iid2:  # peers dont connect to themselves
-                    self._check_ip_assignments(peer1.ainur_config, config2)
-                    peer1.add_peer(ec2host2.vpc_ip)
+            # regional peers, peers dont connect to themselves
+            peer1.add_peers(peer for iid2, peer in regional_peers.items()
+                            if iid2 != iid1)
 
             # non-regional peers
-            for other_host_group in self._conn_hosts.values():
-                for host in other_host_group.values():
-                    self._check_ip_assignments(peer1.ainur_config,
-                                               host.ainur_config)
-                    peer1.add_peer(host.ec2host.public_ip)
+            peer1.add_peers(remote_peers)
 
             cloud_hosts[iid1] = peer1
 
@@ -244,153 +359,203 @@ class VPNCloudMesh(Layer3Network):
             attach_to_instances=True,
             ephemeral=True,
             ingress_rules=[
-                # rules allowing inbound traffic from mgmt vpn
-                IpPermissionTypeDef(
-                    IpRanges=[
-                        IpRangeTypeDef(
-                            CidrIp='0.0.0.0/0', Description='Everywhere'
-                        ),
-                    ],
-                    FromPort=self._gateway.mgmt_cfg.port,
-                    ToPort=self._gateway.mgmt_cfg.port,
-                    IpProtocol='tcp'
-                ),
-                IpPermissionTypeDef(
-                    IpRanges=[
-                        IpRangeTypeDef(
-                            CidrIp='0.0.0.0/0', Description='Everywhere'
-                        ),
-                    ],
-                    FromPort=self._gateway.mgmt_cfg.port,
-                    ToPort=self._gateway.mgmt_cfg.port,
-                    IpProtocol='udp'
-                ),
-                # rules allowing inbound traffic from wkld vpn
-                IpPermissionTypeDef(
-                    IpRanges=[
-                        IpRangeTypeDef(
-                            CidrIp='0.0.0.0/0', Description='Everywhere'
-                        ),
-                    ],
-                    FromPort=self._gateway.wkld_cfg.port,
-                    ToPort=self._gateway.wkld_cfg.port,
-                    IpProtocol='tcp'
-                ),
-                IpPermissionTypeDef(
-                    IpRanges=[
-                        IpRangeTypeDef(
-                            CidrIp='0.0.0.0/0', Description='Everywhere'
-                        ),
-                    ],
-                    FromPort=self._gateway.wkld_cfg.port,
-                    ToPort=self._gateway.wkld_cfg.port,
-                    IpProtocol='udp'
-                ),
+                # rules allowing inbound traffic from mgmt and wkld vpns
+                {
+                    'IpRanges'  : _ANYWHERE,
+                    'FromPort'  : port,
+                    'ToPort'    : port,
+                    'IpProtocol': proto
+                }
+                for port in (self._gateway.mgmt_cfg.port,
+                             self._gateway.wkld_cfg.port)
+                for proto in ('tcp', 'udp')
             ]
         )
 
-        # prepare the ansible inventory to configure the cloud instances
-        keyfile = cloud_layer.keyfile
-        # noinspection DuplicatedCode
-        inventory = {
-            'all': {
-                'hosts': {
-                    host_id: host_cfg.dump_ansible_inventory()
-                    for host_id, host_cfg in cloud_hosts.items()
-                }
-            }
+        # already-connected hosts need to know about the new ones as well,
+        # so they are reconfigured in the same playbook run. their current
+        # peers are saved so they can be rolled back if the run fails.
+        saved_peers = {
+            iid: host.save_peers() for iid, host in self._host_index.items()
         }
-
-        logger.debug(f'Using inventory:\n{yaml.safe_dump(inventory)}')
-        logger.debug(f'Using private key {keyfile}.')
-
-        # deploy
-        with self._ansible_ctx(
-                inventory=inventory,
-                ssh_key=keyfile
-        ) as tmp_dir:
-            res = ansible_runner.run(
-                playbook='vpncloud_up.yml',
-                json_mode=False,
-                private_data_dir=str(tmp_dir),
-                quiet=self._ansible_quiet
-            )
-
-        if res.status == 'failed':
+        new_remote_peers = [
+            self._gateway.gen_peer_configs(ec2host.public_ip)
+            for (_, ec2host), _ in pairings
+        ]
+        for host in connected:
+            host.add_peers(new_remote_peers)
+
+        # deploy, hosts specify their own keyfiles in the inventory so they
+        # can be mixed
+        keyfile = cloud_layer.keyfile
+        try:
+            failed = self._deploy_vpn(keyfile,
+                                      {**self._host_index, **cloud_hosts})
+        except Exception:
+            for iid, saved in saved_peers.items():
+                self._host_index[iid].restore_peers(saved)
+            raise
+
+        if not failed.isdisjoint(cloud_hosts):
             logger.warning(f'Failed to bring up VPN mesh on {cloud_layer}!')
             logger.warning('Attempting to clean up.')
             self._tear_down_vpn(keyfile, cloud_hosts)
+
+            # connected hosts go back to their previous peers, both here and
+            # on the hosts themselves
+            for iid, saved in saved_peers.items():
+                self._host_index[iid].restore_peers(saved)
+            if self._deploy_vpn(keyfile, self._host_index):
+                logger.warning('Could not restore the VPN configuration of '
+                               'all previously connected hosts.')
+
             raise VPNConfigError(f'Failed to bring up '
                                  f'VPN mesh on {cloud_layer}!')
 
+        if failed:
+            # the new hosts are up, but some of the connected hosts could not
+            # be updated; they keep their previous peers
+            logger.warning(f'Could not add {cloud_layer} as peers of '
+                           f'connected hosts {sorted(failed)}.')
+            for iid in failed:
+                self._host_index[iid].restore_peers(saved_peers[iid])
+
         logger.warning(f'VPN mesh on {cloud_layer} deployed.')
 
         # update the host list
-        self._conn_hosts[keyfile].update(cloud_hosts)
-        self._host_ids.update(cloud_hosts.keys())
+        self._ids_by_keyfile[keyfile].extend(cloud_hosts.keys())
+        self._host_index.update(cloud_hosts)
         return self
 
-    @staticmethod
-    def _check_ip_assignments(peer1: AinurCloudHostConfig,
-                              peer2: AinurCloudHostConfig) -> None:
-        try:
-            assert peer1.management_ip.ip != peer2.management_ip.ip
-            assert peer1.workload_ip.ip != peer2.workload_ip.ip
-        except AssertionError:
-            raise VPNConfigError('Clashing IP address configurations for '
-                                 f'{peer1} and {peer2}.')
+    def connect_cloud_async(self,
+                            cloud_layer: CloudInstances,
+                            host_configs: Collection[AinurCloudHostConfig]) \
+            -> Future[VPNCloudMesh]:
+        """
+        Like connect_cloud(), but runs in the background, so that other parts
+        of the testbed can be set up in the meantime. Calls are executed one
+        at a time, in order, and tear_down() waits for any pending ones.
 
-        # TODO: check networks?
+        Parameters
+        ----------
+        cloud_layer
+            Cloud instances to connect to the testbed via VPNCloud.
+        host_configs
+            VPN IP configurations for the cloud hosts. Length must match the
+            number of cloud instances in the cloud layer.
+
+        Returns
+        -------
+        Future
+            Resolves to this mesh once the instances are connected, or
+            raises the error encountered while connecting them.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(self.connect_cloud,
+                                     cloud_layer,
+                                     host_configs)
+
+    def _deploy_vpn(self,
+                    keyfile: str,
+                    hosts: Mapping[str, _VPNCloudHostCfg]) -> Set[str]:
+        # returns the ids of the hosts which could not be configured
+        if not hosts:
+            return set()
+
+        inventory = self._build_inventory(hosts)
+        logger.opt(lazy=True).debug(
+            'Using inventory:\n{}',
+            lambda: dump_json(inventory, pretty=True)
+        )
+        logger.debug(f'Using private key {keyfile}.')
+
+        with self._ansible_env(inventory, ssh_key=keyfile) as tmp_dir:
+            res = ansible_runner.run(
+                playbook='vpncloud_up.yml',
+                json_mode=False,
+                private_data_dir=str(tmp_dir),
+                quiet=self._ansible_quiet,
+                # don't let artifacts pile up in reused environments
+                rotate_artifacts=1,
+                # hosts are configured independently, so do them all at once
+                forks=self._ansible_ctx.forks(len(hosts))
+            )
+
+            if res.status != 'failed':
+                return set()
+
+            # the stats are read from the artifacts, so this needs to happen
+            # before a temporary environment is removed.
+            # hosts that failed, were unreachable, or were never processed
+            # (e.g. in a later batch) all count as failed
+            stats = res.stats or {}
+            configured = set(stats.get('processed', {})) \
+                .difference(stats.get('failures', {}), stats.get('dark', {}))
+            return set(hosts).difference(configured)
 
     def _tear_down_vpn(self,
                        keyfile: str,
                        hosts: Dict[str, _VPNCloudHostCfg]) -> None:
-        # noinspection DuplicatedCode
-        inventory = {
-            'all': {
-                'hosts': {
-                    host_id: host_cfg.dump_ansible_inventory()
-                    for host_id, host_cfg in hosts.items()
-                }
-            }
-        }
-        logger.debug(f'Using inventory:\n{yaml.safe_dump(inventory)}')
+        if not hosts:
+            # nothing to tear down, don't pay for an Ansible run
+            return
+
+        inventory = self._build_inventory(hosts)
+        logger.opt(lazy=True).debug(
+            'Using inventory:\n{}',
+            lambda: dump_json(inventory, pretty=True)
+        )
         logger.debug(f'Keyfile: {keyfile}')
         logger.warning('Tearing down VPN connections...')
-        with self._ansible_ctx(inventory=inventory,
-                               ssh_key=keyfile) as tmp_dir:
+        with self._ansible_env(inventory, ssh_key=keyfile) as tmp_dir:
             ansible_runner.run(
                 playbook='vpncloud_down.yml',
                 json_mode=False,
                 private_data_dir=str(tmp_dir),
-                quiet=self._ansible_quiet
+                quiet=self._ansible_quiet,
+                rotate_artifacts=1,
+                forks=self._ansible_ctx.forks(len(hosts))
             )
 
     def tear_down(self) -> None:
-        for keyfile, hostgroup in self._conn_hosts.items():
-            self._tear_down_vpn(keyfile, hostgroup)
-        self._conn_hosts.clear()
-        self._host_ids.clear()
+        if self._executor is not None:
+            # let pending connections finish before tearing them down
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        # host groups are disjoint and each one gets its own temporary
+        # Ansible environment, so they can be torn down concurrently
+        try:
+            with ThreadPoolExecutor() as tpool:
+                # consume the results to propagate any exceptions
+                list(tpool.map(
+                    lambda keyfile, ids: self._tear_down_vpn(
+                        keyfile, {i: self._host_index[i] for i in ids}
+                    ),
+                    self._ids_by_keyfile.keys(),
+                    self._ids_by_keyfile.values()
+                ))
+        finally:
+            self._ansible_env.close()
+        self._ids_by_keyfile.clear()
+        self._host_index.clear()
         logger.warning('VPN mesh layer torn down.')
 
     def __enter__(self) -> VPNCloudMesh:
         return self
 
     def __iter__(self) -> Iterator[str]:
-        return iter(self._host_ids)
+        return iter(self._host_index)
 
     def __getitem__(self, item: str) -> AinurCloudHost:
-        if item in self._host_ids:
-            for _, hostgroup in self._conn_hosts.items():
-                try:
-                    return hostgroup[item].to_ainur_host()
-                except KeyError:
-                    continue
-
-        raise KeyError(item)
+        host_cfg = self._host_index.get(item)
+        if host_cfg is None:
+            raise KeyError(item)
+        return host_cfg.to_ainur_host()
 
     def __len__(self) -> int:
-        return len(self._host_ids)
+        return len(self._host_index)
 
     def __contains__(self, item: Any) -> bool:
-        return item in self._host_ids
+        return item in self._host_index
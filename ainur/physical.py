@@ -15,8 +15,10 @@
 
 from __future__ import annotations
 
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import AbstractContextManager
-from typing import Collection, Dict, Iterator, List, Mapping
+from typing import Collection, Dict, Iterator, Mapping, Tuple
 
 from loguru import logger
 
@@ -35,6 +37,25 @@ class PhyConfigError(Exception):
     pass
 
 
+class _NullSDRManager:
+    # stands in for the sdr manager when no sdrs are in use, to avoid null
+    # checks in tear down.
+    def create_wlans(self, *args, **kwargs) -> None:
+        pass
+
+    def tear_down(self) -> None:
+        pass
+
+
+_NULL_SDR_MANAGER = _NullSDRManager()
+
+
+def _tear_down_sdr_manager(future: Future) -> None:
+    # done callback for sdr managers that were started but are not needed
+    if future.exception() is None:
+        future.result().tear_down()
+
+
 class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
     """
     Represents the physical layer connections of workload network
@@ -56,17 +77,18 @@ class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
         """
 
         # check that radio names are unique in aps and stas
-        radio_names = set([r.name for r in radio_aps]).union(
-            [r.name for r in radio_aps]
-        )
-
-        # TODO: need better way of checking radio uniqueness
-
-        if len(radio_aps) + len(radio_stas) > len(radio_names):
-            raise PhyConfigError("Repeated radio ids in AP and STA " "definitions!")
+        radio_names = set()
+        for radio in itertools.chain(radio_aps, radio_stas):
+            if radio.name in radio_names:
+                raise PhyConfigError(
+                    f"Repeated radio id {radio.name!r} in AP and STA "
+                    f"definitions!"
+                )
+            radio_names.add(radio.name)
 
-        radios: List[SoftwareDefinedRadio] = list(radio_aps)
-        radios.extend(radio_stas)
+        # materialized once, as both the switch and the sdr manager iterate
+        # over it concurrently
+        radios: Tuple[SoftwareDefinedRadio, ...] = (*radio_aps, *radio_stas)
 
         logger.info("Setting up physical layer.")
         # Instantiate network's switch
@@ -77,40 +99,28 @@ class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
             timeout=5,
         )
         try:
-            # Make workload switch vlans
-            self._switch.make_connections(hosts=hosts, radios=radios)
-
-            # Instantiate sdr network container
-            try:
-                self._sdr_manager = SDRManager(
-                    sdrs=radios,
-                    docker_base_url="unix://var/run/docker.sock",
-                    container_image_name="sdr_manager:latest",
-                    sdr_config_addr="/opt/sdr-manager",
-                    use_jumbo_frames=False,
-                )
-
+            # the sdr manager container does not depend on the switch, so it
+            # is started in the background while the vlans are being made
+            with ThreadPoolExecutor(max_workers=1) as tpool:
+                sdr_future = tpool.submit(self._init_sdr_manager, radios)
                 try:
-                    # Make workload wireless LANS
-                    self._sdr_manager.create_wlans(
-                        hosts=hosts, sdr_aps=radio_aps, sdr_stas=radio_stas
-                    )
+                    # Make workload switch vlans
+                    self._switch.make_connections(hosts=hosts, radios=radios)
                 except Exception:
-                    self._sdr_manager.tear_down()
+                    # don't leave the sdr container running
+                    sdr_future.add_done_callback(_tear_down_sdr_manager)
                     raise
+                self._sdr_manager = sdr_future.result()
 
-            except SDRManagerError:
-                logger.warning(
-                    "Skipping SDR initialization, no SDR networks " "specified."
+            try:
+                # Make workload wireless LANS
+                self._sdr_manager.create_wlans(
+                    hosts=hosts, sdr_aps=radio_aps, sdr_stas=radio_stas
                 )
+            except Exception:
+                self._sdr_manager.tear_down()
+                raise
 
-                # this is to avoid null checks in tear down.
-                # TODO: maybe fix?
-                class DummySDRManager:
-                    def tear_down(self) -> None:
-                        pass
-
-                self._sdr_manager = DummySDRManager()
             self._hosts = hosts.copy()  # make sure to copy so that teardown doesn't
             # have the side effect of deleting the hosts dictionary used for the
             # experiment!
@@ -120,6 +130,23 @@ class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
             self._switch.tear_down()
             raise
 
+    @staticmethod
+    def _init_sdr_manager(radios: Collection[SoftwareDefinedRadio]):
+        # Instantiate sdr network container
+        try:
+            return SDRManager(
+                sdrs=radios,
+                docker_base_url="unix://var/run/docker.sock",
+                container_image_name="sdr_manager:latest",
+                sdr_config_addr="/opt/sdr-manager",
+                use_jumbo_frames=False,
+            )
+        except SDRManagerError:
+            logger.warning(
+                "Skipping SDR initialization, no SDR networks " "specified."
+            )
+            return _NULL_SDR_MANAGER
+
     def __len__(self) -> int:
         # return the number of hosts in the network
         return len(self._hosts)
@@ -143,8 +170,16 @@ class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
         # prepare a temp ansible environment and run the appropriate playbook
         logger.warning("Tearing down physical layer!")
 
-        self._switch.tear_down()
-        self._sdr_manager.tear_down()
+        # the switch and the sdr manager are independent of each other, so
+        # they are torn down concurrently
+        with ThreadPoolExecutor(max_workers=2) as tpool:
+            futures = [
+                tpool.submit(self._switch.tear_down),
+                tpool.submit(self._sdr_manager.tear_down),
+            ]
+        # propagate any exceptions
+        for future in futures:
+            future.result()
         self._hosts.clear()
 
         logger.warning("Physical layer has been torn down.")
@@ -154,4 +189,4 @@ class PhysicalLayer(AbstractContextManager, Mapping[str, LocalAinurHost]):
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
         self.tear_down()
-        return super(PhysicalLayer, self).__exit__(exc_type, exc_val, exc_tb)
+        return False
@@ -15,21 +15,28 @@
 
 from __future__ import annotations
 
-import json
 import socket
 import time
+from collections import defaultdict
 from contextlib import AbstractContextManager
-from typing import Collection, Dict
+from typing import Collection, DefaultDict, Dict, List
 
 import docker
+import orjson
 from loguru import logger
 
 from .hosts import APSoftwareDefinedRadio, LocalAinurHost, \
     SoftwareDefinedRadio, \
     StationSoftwareDefinedRadio
+from .misc import dump_json
 
 # DOCKER_BASE_URL='unix://var/run/docker.sock'
 BEACON_INTERVAL = 100
+# how long to wait for the manager container to accept connections, and how
+# often to retry in the meantime
+CONNECT_TIMEOUT = 10
+CONNECT_RETRY_INTERVAL = 0.05
+RECV_BUFSIZE = 4096
 
 
 class SDRManagerError(Exception):
@@ -50,12 +57,39 @@ class SDRManager(AbstractContextManager):
                  container_image_name: str,
                  sdr_config_addr: str,
                  use_jumbo_frames: bool = False):
+        """
+        Parameters
+        ----------
+        sdrs
+            SDRs to manage.
+        docker_base_url
+            URL of the Docker daemon.
+        container_image_name
+            Image of the SDR manager container.
+        sdr_config_addr
+            Path to the SDR configurations on the host.
+        use_jumbo_frames
+            Enable jumbo frames on the SDRs.
+        """
 
         # need to have at least one sdr?
         if len(sdrs) < 1:
             raise SDRManagerError('No SDRs specified.')
 
         # self._sdrs = sdrs
+
+        # build the init command up front, it only depends on the sdrs
+        nodes_ini = {
+            sdr.name: {'ip_address': str(sdr.management_ip.ip)}
+            for sdr in sdrs
+        }
+        # all sdrs share the same management network
+        sdr = next(iter(sdrs))
+        init_dict = {
+            'nodes_ini'         : nodes_ini,
+            'use_jumbo_frames'  : use_jumbo_frames,
+            'management_network': str(sdr.management_ip.network.network_address)
+        }
         self._docker_base_url = docker_base_url
         self._container_image_name = container_image_name
         self._sdr_config_addr = sdr_config_addr
@@ -84,32 +118,29 @@ class SDRManager(AbstractContextManager):
         self._client.start(self._container)
         logger.info('sdr network container started.')
 
-        time.sleep(1)
-
         # connect to the container server app
-        # start the socket and connect
+        # retry until the server is up, instead of sleeping a fixed amount
         host, port = "localhost", 50505
         # TODO: dont use magic numbers,
         #  put this in variables somewhere
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._socket.settimeout(5)
-        self._socket.connect((host, port))
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                self._socket = socket.create_connection((host, port),
+                                                        timeout=5)
+                break
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    logger.error('Timed out waiting for the SDR manager '
+                                 'container to accept connections.')
+                    raise
+                time.sleep(CONNECT_RETRY_INTERVAL)
+        # commands are small and answered synchronously, don't let Nagle's
+        # algorithm hold them back
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         logger.info('socket connection to SDR network manager established.')
 
-        # send nodes_ini 
-        nodes_ini = {}
-        for sdr in sdrs:
-            nodes_ini[sdr.name] = {
-                'ip_address': str(sdr.management_ip.ip)
-            }
-
-        # noinspection PyUnboundLocalVariable
-        init_dict = {
-            'nodes_ini'         : nodes_ini,
-            'use_jumbo_frames'  : self._use_jumbo_frames,
-            'management_network': str(sdr.management_ip.network.network_address)
-        }
         logger.debug('Initializing SDRs...')
 
         self.send_command('init', init_dict)
@@ -165,17 +196,34 @@ class SDRManager(AbstractContextManager):
             'content': content,
         }
 
-        logger.debug(f'Sending command to SDR manager:\n{cmd}')
-        self._socket.sendall(f'{json.dumps(cmd)}\n'.encode('utf8'))
+        # lazy logging, so that we only serialize if debug logging is enabled
+        logger.opt(lazy=True).debug('Sending command to SDR manager:\n{}',
+                                    lambda: dump_json(cmd, pretty=True))
+        self._socket.sendall(orjson.dumps(cmd) + b'\n')
 
         # Receive response from the server
-        try:
-            received = str(self._socket.recv(3072), "utf-8")
-        except socket.error:
-            logger.error('Encountered an error while contacting SDR manager.')
-            raise
+        # each response is a single JSON object, which might arrive split
+        # over several reads, so keep reading until it decodes
+        received = bytearray()
+        while True:
+            try:
+                chunk = self._socket.recv(RECV_BUFSIZE)
+            except socket.error:
+                logger.error('Encountered an error while contacting SDR '
+                             'manager.')
+                raise
+
+            if not chunk:
+                raise SDRManagerError('SDR manager closed the connection.')
+
+            received += chunk
+            try:
+                result_dict = orjson.loads(received)
+                break
+            except orjson.JSONDecodeError:
+                # incomplete response, wait for the rest of it
+                continue
 
-        result_dict = json.loads(received)
         if result_dict['outcome'] == 'failed':
             logger.error(result_dict['content']['msg'])
             raise SDRManagerError(result_dict['content']['msg'])
@@ -188,28 +236,30 @@ class SDRManager(AbstractContextManager):
         # find wlan_aps and create a wlan network per SDR AP
         # find sdr station wifis and foreign_sta_macs
 
+        # index SDR STAs and native STA macs by ssid in a single pass each
+        stations_by_ssid: DefaultDict[str, List[StationSoftwareDefinedRadio]] \
+            = defaultdict(list)
+        for sta_radio in sdr_stas:
+            stations_by_ssid[sta_radio.ssid].append(sta_radio)
+
+        native_macs_by_ssid: DefaultDict[str, List[str]] = defaultdict(list)
+        for host in hosts.values():
+            for config in host.wifis.values():
+                native_macs_by_ssid[config.ssid].append(config.mac)
+
         for ap_radio in sdr_aps:
             logger.info(f'Initializing SDR WiFi '
                         f'network on radio {ap_radio.name}.')
-            logger.debug(f'Radio config: {ap_radio.to_json(indent=4)}')
-
-            # find SDRs STAs connected to the AP ssid
-            ap_stations = [
-                sta_radio for sta_radio in sdr_stas
-                if sta_radio.ssid == ap_radio.ssid
-            ]
-
-            # find native STAs connected to the AP ssid
-            native_station_macs = []
-            for host_name, host in hosts.items():
-                for iface, config in host.wifis.items():
-                    if config.ssid == ap_radio.ssid:
-                        native_station_macs.append(config.mac)
+            logger.opt(lazy=True).debug(
+                'Radio config: {}', lambda: ap_radio.to_json(indent=4)
+            )
 
             self.start_network(
                 sdr_ap=ap_radio,
-                sdr_stas=ap_stations,
-                foreign_sta_macs=native_station_macs
+                # SDR STAs connected to the AP ssid
+                sdr_stas=stations_by_ssid.get(ap_radio.ssid, []),
+                # native STAs connected to the AP ssid
+                foreign_sta_macs=native_macs_by_ssid.get(ap_radio.ssid, [])
             )
 
     def tear_down(self) -> None:
@@ -225,6 +275,7 @@ class SDRManager(AbstractContextManager):
         self._socket.close()
         # stop the container
         self._client.stop(container=self._container, timeout=1)
+        self._client.close()
 
         logger.warning('SDR network is stopped.')
 
@@ -233,4 +284,4 @@ class SDRManager(AbstractContextManager):
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
         self.tear_down()
-        return super(SDRManager, self).__exit__(exc_type, exc_val, exc_tb)
+        return False
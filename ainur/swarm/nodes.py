@@ -17,7 +17,7 @@ from __future__ import annotations
 
 import abc
 import warnings
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass, field
 from typing import Dict, Generator, Literal, Optional
 
@@ -159,7 +159,8 @@ class ManagerNode(SwarmNode):
                      host: AinurHost,
                      token: str,
                      node_spec: _NodeSpec,
-                     daemon_port: int = 2375) -> str:
+                     daemon_port: int = 2375,
+                     manager_client: Optional[DockerClient] = None) -> str:
         logger.info(f'Attaching host {host} to swarm managed by {self.host}.')
         logger.debug(f'Applying node spec:\n{node_spec.to_json(indent=4)}')
         try:
@@ -179,10 +180,15 @@ class ManagerNode(SwarmNode):
                 node_id = client.info()['Swarm']['NodeID']
                 logger.info(f'{host} joined the swarm, assigned ID: {node_id}.')
 
-            # set the node spec, from the manager
-            with docker_client_context(
+            # set the node spec, from the manager, reusing the caller's client
+            # to it if there is one
+            if manager_client is not None:
+                spec_client = nullcontext(manager_client)
+            else:
+                spec_client = docker_client_context(
                     base_url=f'{self.host.management_ip.ip}:{daemon_port}'
-            ) as client:
+                )
+            with spec_client as client:
                 new_node = client.nodes.get(node_id)
                 new_node.update(node_spec.to_dict())
                 logger.info(f'Set node spec for {host}.')
@@ -195,13 +201,15 @@ class ManagerNode(SwarmNode):
     def attach_manager(self,
                        host: AinurHost,
                        labels: Optional[Dict[str, str]] = None,
-                       daemon_port: int = 2375) -> ManagerNode:
+                       daemon_port: int = 2375,
+                       manager_client: Optional[DockerClient] = None) \
+            -> ManagerNode:
         node_spec = _NodeSpec(
             Role='manager',
             Labels=frozendict(labels) if labels is not None else {}
         )
         node_id = self._attach_host(host, self.manager_token,
-                                    node_spec, daemon_port)
+                                    node_spec, daemon_port, manager_client)
 
         return ManagerNode(
             node_id=node_id,
@@ -215,13 +223,15 @@ class ManagerNode(SwarmNode):
     def attach_worker(self,
                       host: AinurHost,
                       labels: Optional[Dict[str, str]] = None,
-                      daemon_port: int = 2375) -> WorkerNode:
+                      daemon_port: int = 2375,
+                      manager_client: Optional[DockerClient] = None) \
+            -> WorkerNode:
         node_spec = _NodeSpec(
             Role='worker',
             Labels=frozendict(labels) if labels is not None else {}
         )
         node_id = self._attach_host(host, self.worker_token,
-                                    node_spec, daemon_port)
+                                    node_spec, daemon_port, manager_client)
 
         return WorkerNode(
             node_id=node_id,
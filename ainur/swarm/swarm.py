@@ -24,6 +24,7 @@ from typing import Any, Collection, Dict, FrozenSet, Mapping, \
     Optional, \
     Set, Tuple
 
+from docker import DockerClient
 from docker.models.services import Service
 from loguru import logger
 from python_on_whales import DockerClient as WhaleClient, DockerException
@@ -38,6 +39,14 @@ from ..misc import RepeatingTimer, seconds2hms
 
 # TODO: daemon port should be handled in hosts?
 
+# node operations are I/O-bound, so use one thread per node up to this limit
+_MAX_NODE_THREADS = 32
+
+
+def _node_threads(num_nodes: int) -> int:
+    return max(1, min(_MAX_NODE_THREADS, num_nodes))
+
+
 class ServiceHealthCheckThread(RepeatingTimer):
     # checking for x in set is O(1)
     _unhealthy_task_states = {'failed', 'rejected', 'orphaned'}
@@ -159,6 +168,26 @@ class DockerSwarm(AbstractContextManager):
         self._manager_nodes: Set[ManagerNode] = set()
         self._worker_nodes: Set[WorkerNode] = set()
 
+        # docker clients to the manager daemons, keyed by base url, so that
+        # attaching many nodes doesn't open a new connection for each one
+        self._clients: Dict[str, DockerClient] = {}
+        self._clients_lock = threading.Lock()
+
+    def _get_client(self, node: SwarmNode) -> DockerClient:
+        base_url = f'{node.host.management_ip.ip}:{node.daemon_port}'
+        with self._clients_lock:
+            client = self._clients.get(base_url)
+            if client is None:
+                client = DockerClient(base_url=base_url)
+                self._clients[base_url] = client
+            return client
+
+    def _close_clients(self) -> None:
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
     def deploy_managers(self,
                         hosts: Mapping[AinurHost, Dict[str, Any]],
                         **default_labels: Any,
@@ -183,13 +212,14 @@ class DockerSwarm(AbstractContextManager):
         hosts = dict(hosts)
         while len(hosts) > 0:
             try:
-                mgr_node = self._manager_nodes.pop()
-                self._manager_nodes.add(mgr_node)
+                mgr_node = next(iter(self._manager_nodes))
 
                 logger.info(f'Deploying hosts {hosts.keys()} as Swarm '
                             f'managers.')
+                mgr_client = self._get_client(mgr_node)
 
-                with ThreadPoolExecutor() as tpool:
+                with ThreadPoolExecutor(
+                        max_workers=_node_threads(len(hosts))) as tpool:
                     # use thread pool instead of process pool, as we only really
                     # need I/O concurrency (Docker client comms) and threads are
                     # much more lightweight than processes
@@ -204,7 +234,8 @@ class DockerSwarm(AbstractContextManager):
                             node = mgr_node.attach_manager(
                                 host=host,
                                 labels=labels,
-                                daemon_port=self._daemon_port
+                                daemon_port=self._daemon_port,
+                                manager_client=mgr_client
                             )
                             self._manager_nodes.add(node)
                         except Exception as e:
@@ -225,7 +256,7 @@ class DockerSwarm(AbstractContextManager):
 
                 hosts.clear()
                 return self
-            except KeyError:
+            except StopIteration:
                 # if no existing managers, first create the swarm
                 host, host_labels = hosts.popitem()
                 labels = dict(default_labels)
@@ -252,7 +283,8 @@ class DockerSwarm(AbstractContextManager):
         """
 
         # TODO: put this pattern in a separate function/class
-        with ThreadPoolExecutor() as tpool:
+        with ThreadPoolExecutor(
+                max_workers=_node_threads(self.num_nodes)) as tpool:
             exc_lock = threading.RLock()
             caught_exceptions = deque()
 
@@ -297,9 +329,10 @@ class DockerSwarm(AbstractContextManager):
         """
 
         try:
-            mgr_node = self._manager_nodes.pop()
-            self._manager_nodes.add(mgr_node)
-            with ThreadPoolExecutor() as tpool:
+            mgr_node = next(iter(self._manager_nodes))
+            mgr_client = self._get_client(mgr_node)
+            with ThreadPoolExecutor(
+                    max_workers=_node_threads(len(hosts))) as tpool:
                 # use thread pool instead of process pool, as we only really
                 # need I/O concurrency (Docker client comms) and threads are
                 # much more lightweight than processes
@@ -314,7 +347,8 @@ class DockerSwarm(AbstractContextManager):
                         node = mgr_node.attach_worker(
                             host=host,
                             labels=labels,
-                            daemon_port=self._daemon_port
+                            daemon_port=self._daemon_port,
+                            manager_client=mgr_client
                         )
                         self._worker_nodes.add(node)
                     except Exception as e:
@@ -334,7 +368,7 @@ class DockerSwarm(AbstractContextManager):
                     from caught_exceptions.pop()
 
             return self
-        except KeyError:
+        except StopIteration:
             # if no existing managers, we have a problem
             raise SwarmException('No managers available in the Swarm, cannot '
                                  'deploy worker nodes!')
@@ -354,7 +388,8 @@ class DockerSwarm(AbstractContextManager):
 
     @staticmethod
     def _tear_down(nodes: Collection[SwarmNode]):
-        with ThreadPoolExecutor() as tpool:
+        with ThreadPoolExecutor(
+                max_workers=_node_threads(len(nodes))) as tpool:
             def leave_swarm(node: SwarmNode) -> None:
                 node.leave_swarm(force=True)
 
@@ -370,10 +405,13 @@ class DockerSwarm(AbstractContextManager):
         """
 
         logger.warning('Tearing down Swarm!')
-        self._tear_down(self._worker_nodes)
-        self._worker_nodes.clear()
-        self._tear_down(self._manager_nodes)
-        self._manager_nodes.clear()
+        try:
+            self._tear_down(self._worker_nodes)
+            self._worker_nodes.clear()
+            self._tear_down(self._manager_nodes)
+            self._manager_nodes.clear()
+        finally:
+            self._close_clients()
         logger.warning('Swarm has been torn down.')
 
     def __enter__(self) -> DockerSwarm:
@@ -32,6 +32,7 @@ from dataclasses_json import config, dataclass_json
 from loguru import logger
 
 from .errors import ConfigError
+from ..misc import YAMLLoader
 
 _min_compose_version = LooseVersion('3.0')
 
@@ -149,7 +150,7 @@ class WorkloadSpecification:
             A parsed specification instance.
         """
         with Path(path).open('r') as fp:
-            spec = yaml.safe_load(fp)
+            spec = yaml.load(fp, Loader=YAMLLoader)
 
         return WorkloadSpecification.from_dict(spec)
 
@@ -398,7 +398,11 @@ def get_hosts(
     client_count: int,
     iface: Literal["wifi", "ethernet"],
 ) -> Dict[str, LocalAinurHost]:
-    assert client_count <= len(CLIENT_HOSTS)
+    if client_count > len(CLIENT_HOSTS):
+        raise ValueError(
+            f"Requested {client_count} clients but only {len(CLIENT_HOSTS)} "
+            f"are available."
+        )
 
     keys = random.sample(
         population=CLIENT_HOSTS.keys(),
@@ -421,7 +425,9 @@ def get_hosts(
 
 
 def generate_cloud_host_configs(count: int) -> List[AinurCloudHostConfig]:
-    assert count <= 253
+    if count > 253:
+        raise ValueError(f"Cannot generate more than 253 cloud host configs "
+                         f"in a /24 network (requested {count}).")
     return [
         AinurCloudHostConfig(
             management_ip=IPv4Interface(f"172.16.0.{i}/24"),
@@ -13,21 +13,29 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+from functools import lru_cache
 from importlib import resources
 from ipaddress import IPv4Interface
 
 import yaml
+from frozendict import frozendict
 
 from ainur.hosts import Switch
+from ainur.misc import YAMLLoader
 from . import res
 
 __all__ = ["get_aws_ami_id_for_region", "switch"]
 
 
-def get_aws_ami_id_for_region(region: str) -> str:
+@lru_cache(maxsize=1)
+def _load_ami_ids() -> frozendict[str, str]:
+    # the ami ids only change with the package, so parse them only once
     ami_file = resources.files(res).joinpath("offload-ami-ids.yaml")
-    with resources.as_file(ami_file) as ami_path:
-        return yaml.safe_load(ami_path)[region]
+    return frozendict(yaml.load(ami_file.read_text(), Loader=YAMLLoader))
+
+
+def get_aws_ami_id_for_region(region: str) -> str:
+    return _load_ami_ids()[region]
 
 
 # the workload switch, no need to change this
@@ -0,0 +1,78 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from ainur.ansible import AnsibleContext
+
+_BASE_DIR = Path(__file__).parents[1] / 'ansible_env'
+
+
+class TestAnsibleEnvironment(TestCase):
+    def setUp(self) -> None:
+        self.ansible_ctx = AnsibleContext(base_dir=_BASE_DIR)
+        self.inventory = {'all': {'hosts': {'a': {}}}}
+
+    def test_temporary_environments(self) -> None:
+        ansible_env = self.ansible_ctx.environment(batch_size=2)
+        with ansible_env(self.inventory) as env_dir:
+            self.assertTrue((env_dir / 'inventory' / 'hosts.json').exists())
+        self.assertFalse(env_dir.exists())
+
+    def test_reused_environment_removed_on_close(self) -> None:
+        ansible_env = self.ansible_ctx.environment(reuse=True)
+        with ansible_env(self.inventory) as env_dir:
+            pass
+        with ansible_env({'all': {'hosts': {'b': {}}}}) as reused_dir:
+            self.assertEqual(env_dir, reused_dir)
+            hosts = (reused_dir / 'inventory' / 'hosts.json').read_text()
+            self.assertIn('"b"', hosts)
+        self.assertTrue(env_dir.exists())
+
+        ansible_env.close()
+        self.assertFalse(env_dir.exists())
+
+    def test_invalid_batch_size(self) -> None:
+        with self.assertRaises(ValueError):
+            self.ansible_ctx.environment(batch_size=0)
+
+
+class TestAnsibleForks(TestCase):
+    def make_context(self, cmdline: str) -> AnsibleContext:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        base_dir = Path(tmp_dir.name)
+        (base_dir / 'project').mkdir()
+        (base_dir / 'env').mkdir()
+        (base_dir / 'env' / 'cmdline').write_text(cmdline)
+        return AnsibleContext(base_dir=base_dir)
+
+    def test_configured_forks_kept(self) -> None:
+        ansible_ctx = AnsibleContext(base_dir=_BASE_DIR)  # --forks 20
+        self.assertIsNone(ansible_ctx.forks(20))
+        self.assertEqual(30, ansible_ctx.forks(30))
+
+    def test_forks_parsed_from_cmdline(self) -> None:
+        for cmdline in ('--become --forks=2', '-f 2', '-f2'):
+            ansible_ctx = self.make_context(cmdline)
+            self.assertIsNone(ansible_ctx.forks(2), cmdline)
+            self.assertEqual(3, ansible_ctx.forks(3), cmdline)
+
+    def test_ansible_default_forks(self) -> None:
+        ansible_ctx = self.make_context('--become')
+        self.assertIsNone(ansible_ctx.forks(5))
+        self.assertEqual(6, ansible_ctx.forks(6))
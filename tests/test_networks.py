@@ -0,0 +1,79 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Iterator, Optional
+from unittest import TestCase
+
+from ainur.hosts import AinurHost
+from ainur.networks.common import CompositeLayer3Network, Layer3Error, \
+    Layer3Network
+
+
+class _FakeNetwork(Layer3Network):
+    def __init__(self, barrier: Optional[threading.Barrier] = None,
+                 fail: bool = False):
+        self.barrier = barrier
+        self.fail = fail
+        self.torn_down = False
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(())
+
+    def __getitem__(self, item: str) -> AinurHost:
+        raise KeyError(item)
+
+    def __len__(self) -> int:
+        return 0
+
+    def __contains__(self, item: Any) -> bool:
+        return False
+
+    def __enter__(self) -> _FakeNetwork:
+        return self
+
+    def tear_down(self) -> None:
+        if self.barrier is not None:
+            # only passes if all the networks are torn down at the same time
+            self.barrier.wait()
+        self.torn_down = True
+        if self.fail:
+            raise Layer3Error('tear down failed')
+
+
+class TestCompositeLayer3Network(TestCase):
+    def make_composite(self, *networks: _FakeNetwork) \
+            -> CompositeLayer3Network:
+        composite = CompositeLayer3Network()
+        for net in networks:
+            composite.add_network(net)
+        return composite.__enter__()
+
+    def test_tear_down_concurrent(self) -> None:
+        barrier = threading.Barrier(3, timeout=5)
+        networks = [_FakeNetwork(barrier) for _ in range(3)]
+        self.make_composite(*networks).tear_down()
+        self.assertTrue(all(net.torn_down for net in networks))
+
+    def test_failed_tear_down_doesnt_stop_others(self) -> None:
+        networks = [_FakeNetwork(), _FakeNetwork(fail=True), _FakeNetwork()]
+        composite = self.make_composite(*networks)
+
+        with self.assertRaises(Layer3Error):
+            composite.tear_down()
+        self.assertTrue(all(net.torn_down for net in networks))
+        self.assertEqual(0, len(composite))
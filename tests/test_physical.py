@@ -0,0 +1,72 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from ipaddress import IPv4Interface
+from unittest import TestCase, mock
+
+from ainur.hosts import APSoftwareDefinedRadio, Switch, \
+    StationSoftwareDefinedRadio
+from ainur.physical import PhyConfigError, PhysicalLayer
+
+_SWITCH = Switch(name='switch',
+                 management_ip=IPv4Interface('192.168.0.2/24'),
+                 username='user',
+                 password='pass')
+
+
+def _ap(name: str) -> APSoftwareDefinedRadio:
+    return APSoftwareDefinedRadio(name=name,
+                                  management_ip=IPv4Interface('10.0.0.1/24'),
+                                  mac='00:00:00:00:00:01',
+                                  ssid='ssid',
+                                  net_name='net',
+                                  switch_port=1,
+                                  channel=11,
+                                  beacon_interval=100,
+                                  ht_capable=True)
+
+
+def _sta(name: str) -> StationSoftwareDefinedRadio:
+    return StationSoftwareDefinedRadio(
+        name=name,
+        management_ip=IPv4Interface('10.0.0.2/24'),
+        mac='00:00:00:00:00:02',
+        ssid='ssid',
+        net_name='net',
+        switch_port=2
+    )
+
+
+class TestPhysicalLayerRadioNames(TestCase):
+    def setUp(self) -> None:
+        # the name check has to run before the switch is touched
+        patcher = mock.patch('ainur.physical.ManagedSwitch')
+        self.switch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeated_ap_sta_name(self) -> None:
+        with self.assertRaises(PhyConfigError):
+            PhysicalLayer({}, [_ap('r1')], [_sta('r1')], _SWITCH)
+        self.switch.assert_not_called()
+
+    def test_repeated_sta_name(self) -> None:
+        with self.assertRaises(PhyConfigError):
+            PhysicalLayer({}, [_ap('r1')], [_sta('r2'), _sta('r2')], _SWITCH)
+        self.switch.assert_not_called()
+
+    def test_unique_names(self) -> None:
+        self.switch.side_effect = RuntimeError('switch reached')
+        with self.assertRaisesRegex(RuntimeError, 'switch reached'):
+            PhysicalLayer({}, [_ap('r1')], [_sta('r2'), _sta('r3')], _SWITCH)
@@ -0,0 +1,29 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from unittest import TestCase
+
+from ainur_utils.resources import get_aws_ami_id_for_region
+
+
+class TestAMIIds(TestCase):
+    def test_get_ami_id(self) -> None:
+        ami_id = get_aws_ami_id_for_region('eu-north-1')
+        self.assertTrue(ami_id.startswith('ami-'))
+        self.assertEqual(ami_id, get_aws_ami_id_for_region('eu-north-1'))
+
+    def test_unknown_region(self) -> None:
+        with self.assertRaises(KeyError):
+            get_aws_ami_id_for_region('nowhere-1')
@@ -0,0 +1,58 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import socket
+import threading
+from unittest import TestCase
+
+from ainur.sdr_manager import SDRManager, SDRManagerError
+
+
+class TestSDRManagerCommands(TestCase):
+    def setUp(self) -> None:
+        # bypass __init__, which starts the manager container
+        self.manager = SDRManager.__new__(SDRManager)
+        self.manager._socket, self.server = socket.socketpair()
+        self.manager._socket.settimeout(5)
+        self.addCleanup(self.manager._socket.close)
+        self.addCleanup(self.server.close)
+
+    def reply(self, *chunks: bytes, close: bool = False) -> None:
+        def _reply() -> None:
+            self.server.recv(4096)
+            for chunk in chunks:
+                self.server.sendall(chunk)
+            if close:
+                self.server.shutdown(socket.SHUT_WR)
+
+        threading.Thread(target=_reply, daemon=True).start()
+
+    def test_split_response_without_newline(self) -> None:
+        self.reply(b'{"outcome": "succ', b'ess", "content": {}}')
+        self.manager.send_command('init', {})
+
+    def test_newline_terminated_response(self) -> None:
+        self.reply(b'{"outcome": "success", "content": {}}\n')
+        self.manager.send_command('init', {})
+
+    def test_failed_command(self) -> None:
+        self.reply(b'{"outcome": "failed", "content": {"msg": "nope"}}')
+        with self.assertRaises(SDRManagerError):
+            self.manager.send_command('init', {})
+
+    def test_connection_closed(self) -> None:
+        self.reply(b'{"outcome": ', close=True)
+        with self.assertRaises(SDRManagerError):
+            self.manager.send_command('init', {})
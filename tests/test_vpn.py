@@ -0,0 +1,318 @@
+#  Copyright (c) 2022 KTH Royal Institute of Technology, Sweden,
+#  and the ExPECA Research Group (PI: Prof. James Gross).
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import dataclasses
+import tempfile
+import threading
+from contextlib import contextmanager
+from ipaddress import IPv4Address, IPv4Interface, IPv4Network
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional
+from unittest import TestCase, mock
+
+from ansible_runner.exceptions import AnsibleRunnerException
+
+from ainur.ansible import AnsibleContext, AnsibleEnvironment
+from ainur.cloud.aws import EC2Host
+from ainur.hosts import AinurCloudHostConfig
+from ainur.networks.vpn import VPNCloudMesh, VPNConfigError, _Gateway, \
+    _MeshConfig, _VPNCloudHostCfg
+
+
+class TestVPNCloudHostCfg(TestCase):
+    gateway = _Gateway(
+        public_ip=IPv4Address('130.237.53.70'),
+        mgmt_cfg=_MeshConfig(
+            ip=IPv4Interface('172.16.0.1/16'),
+            psk='psk',
+            port=3210,
+            local_net=IPv4Network('192.168.0.0/16')
+        ),
+        wkld_cfg=_MeshConfig(
+            ip=IPv4Interface('172.16.1.1/16'),
+            psk='psk',
+            port=3211,
+            local_net=IPv4Network('10.0.0.0/16')
+        )
+    )
+
+    def setUp(self) -> None:
+        self.host_cfg = _VPNCloudHostCfg(
+            ec2host=EC2Host(
+                instance_id='i-0123456789',
+                public_ip=IPv4Address('13.48.0.10'),
+                vpc_ip=IPv4Address('172.31.0.10'),
+                key_file='/tmp/key.pem'
+            ),
+            ainur_config=AinurCloudHostConfig(
+                management_ip=IPv4Interface('172.16.0.2/24'),
+                workload_ip=IPv4Interface('172.16.1.2/24'),
+                ansible_user='ubuntu',
+            ),
+            gateway=self.gateway
+        )
+
+    def test_gateway_is_peer(self) -> None:
+        vpn_cfgs = self.host_cfg.dump_ansible_inventory()['vpn_configs']
+        self.assertListEqual(['130.237.53.70:3210'],
+                             vpn_cfgs['management']['peers'])
+        self.assertListEqual(['130.237.53.70:3211'],
+                             vpn_cfgs['workload']['peers'])
+
+    def test_peers_keep_insertion_order(self) -> None:
+        peers = [IPv4Address(f'172.31.0.{i}') for i in (30, 20, 40, 20)]
+        for peer in peers:
+            self.host_cfg.add_peer(peer)
+
+        vpn_cfgs = self.host_cfg.dump_ansible_inventory()['vpn_configs']
+        self.assertListEqual(
+            ['130.237.53.70:3210',
+             '172.31.0.30:3210',
+             '172.31.0.20:3210',
+             '172.31.0.40:3210'],
+            vpn_cfgs['management']['peers']
+        )
+        self.assertListEqual(
+            ['130.237.53.70:3211',
+             '172.31.0.30:3211',
+             '172.31.0.20:3211',
+             '172.31.0.40:3211'],
+            vpn_cfgs['workload']['peers']
+        )
+
+    def test_inventory_updated_on_new_peer(self) -> None:
+        inventory = self.host_cfg.dump_ansible_inventory()
+        self.assertIs(inventory, self.host_cfg.dump_ansible_inventory())
+
+        self.host_cfg.add_peer(IPv4Address('172.31.0.11'))
+        inventory = self.host_cfg.dump_ansible_inventory()
+        self.assertIn('172.31.0.11:3210',
+                      inventory['vpn_configs']['management']['peers'])
+        self.assertIn('172.31.0.11:3211',
+                      inventory['vpn_configs']['workload']['peers'])
+
+
+class TestVPNCloudMeshAsync(TestCase):
+    def setUp(self) -> None:
+        self.mesh = VPNCloudMesh(
+            gateway_ip=IPv4Address('130.237.53.70'),
+            vpn_psk='psk',
+            ansible_ctx=mock.Mock(spec=AnsibleContext)
+        )
+
+    def test_connect_cloud_async(self) -> None:
+        with mock.patch.object(VPNCloudMesh, 'connect_cloud',
+                               autospec=True,
+                               side_effect=lambda mesh, *_: mesh) as connect:
+            future = self.mesh.connect_cloud_async(mock.sentinel.cloud, [])
+            self.assertIs(self.mesh, future.result(timeout=5))
+            connect.assert_called_once_with(self.mesh,
+                                            mock.sentinel.cloud, [])
+
+    def test_connect_cloud_async_error(self) -> None:
+        with mock.patch.object(VPNCloudMesh, 'connect_cloud',
+                               side_effect=RuntimeError):
+            future = self.mesh.connect_cloud_async(mock.sentinel.cloud, [])
+            self.assertRaises(RuntimeError, future.result, timeout=5)
+
+    def test_tear_down_waits_for_pending(self) -> None:
+        release = threading.Event()
+        with mock.patch.object(VPNCloudMesh, 'connect_cloud',
+                               side_effect=lambda *_: release.wait(5)):
+            future = self.mesh.connect_cloud_async(mock.sentinel.cloud, [])
+            self.assertFalse(future.done())
+
+            threading.Timer(0.1, release.set).start()
+            self.mesh.tear_down()
+            self.assertTrue(future.done())
+
+
+class _FakeCloud(dict):
+    # stands in for CloudInstances, with hosts i-<first>...i-<first + n - 1>
+    keyfile = '/tmp/key.pem'
+
+    def __init__(self, first: int, n: int):
+        super(_FakeCloud, self).__init__({
+            f'i-{i}': EC2Host(
+                instance_id=f'i-{i}',
+                public_ip=IPv4Address(f'13.0.0.{i}'),
+                vpc_ip=IPv4Address(f'172.31.0.{i}'),
+                key_file=self.keyfile
+            ) for i in range(first, first + n)
+        })
+        self.configs = [
+            AinurCloudHostConfig(
+                management_ip=IPv4Interface(f'172.16.0.{i + 2}/24'),
+                workload_ip=IPv4Interface(f'172.16.1.{i + 2}/24'),
+                ansible_user='ubuntu',
+            ) for i in range(first, first + n)
+        ]
+
+    def create_sec_group(self, **kwargs: Any) -> None:
+        pass
+
+
+class _FakeRunner:
+    # stands in for ansible_runner.Runner, which reads its stats from the
+    # artifacts in the private data dir
+    def __init__(self, status: str, stats: Optional[Dict[str, Any]] = None):
+        self.status = status
+        self._stats = stats
+        self.private_data_dir: Optional[Path] = None
+
+    @property
+    def stats(self) -> Optional[Dict[str, Any]]:
+        if not self.private_data_dir.exists():
+            raise AnsibleRunnerException('Artifacts have been removed.')
+        return self._stats
+
+
+@contextmanager
+def _temp_env(**kwargs: Any) -> Generator[Path, None, None]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+
+class TestVPNCloudMeshConnect(TestCase):
+    def setUp(self) -> None:
+        self.ansible_ctx = mock.MagicMock(spec=AnsibleContext)
+        self.ansible_ctx.side_effect = _temp_env
+        self.ansible_ctx.environment.return_value = \
+            AnsibleEnvironment(self.ansible_ctx, reuse=False, extravars={})
+        self.mesh = VPNCloudMesh(
+            gateway_ip=IPv4Address('130.237.53.70'),
+            vpn_psk='psk',
+            ansible_ctx=self.ansible_ctx
+        )
+
+        # results of the next playbook runs, successful once these run out
+        self.runners: List[_FakeRunner] = []
+        patcher = mock.patch('ainur.networks.vpn.ansible_runner.run')
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.run.side_effect = self.next_runner
+
+        # two hosts connected beforehand
+        self.mesh.connect_cloud(cloud := _FakeCloud(0, 2), cloud.configs)
+        self.peers_before = self.mgmt_peers('i-0')
+        self.ansible_ctx.reset_mock()
+        self.run.reset_mock()
+
+    def next_runner(self, **kwargs: Any) -> _FakeRunner:
+        runner = self.runners.pop(0) if self.runners \
+            else _FakeRunner('successful')
+        runner.private_data_dir = Path(kwargs['private_data_dir'])
+        return runner
+
+    def mgmt_peers(self, host_id: str) -> List[str]:
+        inventory = self.mesh._host_index[host_id].dump_ansible_inventory()
+        return inventory['vpn_configs']['management']['peers']
+
+    def inventories(self) -> List[Dict[str, Any]]:
+        return [c.kwargs['inventory']['all']['hosts']
+                for c in self.ansible_ctx.call_args_list]
+
+    def test_connected_hosts_get_new_peers(self) -> None:
+        self.mesh.connect_cloud(cloud := _FakeCloud(2, 1), cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1', 'i-2'}, set(self.mesh))
+        self.assertListEqual(self.peers_before + ['13.0.0.2:3210'],
+                             self.mgmt_peers('i-0'))
+
+        # a single run reconfigures both new and connected hosts
+        self.run.assert_called_once()
+        self.assertEqual([{'i-0', 'i-1', 'i-2'}],
+                         [set(inv) for inv in self.inventories()])
+
+    def test_failed_new_host_rolls_back_peers(self) -> None:
+        self.runners.append(_FakeRunner('failed', stats={
+            'processed': {'i-0': 1, 'i-1': 1, 'i-2': 1, 'i-3': 1},
+            'failures' : {'i-3': 1},
+            'dark'     : {},
+        }))
+        with self.assertRaises(VPNConfigError):
+            self.mesh.connect_cloud(cloud := _FakeCloud(2, 2), cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1'}, set(self.mesh))
+        self.assertListEqual(self.peers_before, self.mgmt_peers('i-0'))
+
+        # new hosts are torn down, connected hosts get their old peers back
+        self.assertListEqual(
+            ['vpncloud_up.yml', 'vpncloud_down.yml', 'vpncloud_up.yml'],
+            [c.kwargs['playbook'] for c in self.run.call_args_list]
+        )
+        _, torn_down, restored = self.inventories()
+        self.assertEqual({'i-2', 'i-3'}, set(torn_down))
+        self.assertEqual({'i-0', 'i-1'}, set(restored))
+        self.assertListEqual(
+            self.peers_before,
+            restored['i-0']['vpn_configs']['management']['peers']
+        )
+
+    def test_failed_connected_host_keeps_new_hosts(self) -> None:
+        self.runners.append(_FakeRunner('failed', stats={
+            'processed': {'i-1': 1, 'i-2': 1},
+            'failures' : {},
+            'dark'     : {'i-0': 1},
+        }))
+        self.mesh.connect_cloud(cloud := _FakeCloud(2, 1), cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1', 'i-2'}, set(self.mesh))
+        self.run.assert_called_once()
+
+        # only the unreachable host keeps its previous peers
+        self.assertListEqual(self.peers_before, self.mgmt_peers('i-0'))
+        self.assertIn('13.0.0.2:3210', self.mgmt_peers('i-1'))
+
+    def test_failed_sec_group_rolls_back_peers(self) -> None:
+        cloud = _FakeCloud(2, 1)
+        with mock.patch.object(cloud, 'create_sec_group',
+                               side_effect=RuntimeError('AWS error')):
+            with self.assertRaises(RuntimeError):
+                self.mesh.connect_cloud(cloud, cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1'}, set(self.mesh))
+        self.assertListEqual(self.peers_before, self.mgmt_peers('i-0'))
+        self.run.assert_not_called()
+
+        # a later connection doesn't push the hosts that never joined
+        self.mesh.connect_cloud(cloud := _FakeCloud(3, 1), cloud.configs)
+        self.assertListEqual(self.peers_before + ['13.0.0.3:3210'],
+                             self.mgmt_peers('i-0'))
+
+    def test_clashing_new_hosts(self) -> None:
+        cloud = _FakeCloud(2, 2)
+        cloud.configs[1] = dataclasses.replace(
+            cloud.configs[1],
+            management_ip=cloud.configs[0].management_ip
+        )
+        with self.assertRaises(VPNConfigError):
+            self.mesh.connect_cloud(cloud, cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1'}, set(self.mesh))
+        self.run.assert_not_called()
+
+    def test_clashing_connected_host(self) -> None:
+        cloud = _FakeCloud(2, 1)
+        cloud.configs[0] = dataclasses.replace(
+            cloud.configs[0],
+            workload_ip=_FakeCloud(0, 1).configs[0].workload_ip
+        )
+        with self.assertRaises(VPNConfigError):
+            self.mesh.connect_cloud(cloud, cloud.configs)
+
+        self.assertEqual({'i-0', 'i-1'}, set(self.mesh))
+        self.assertListEqual(self.peers_before, self.mgmt_peers('i-0'))
+        self.run.assert_not_called()